@@ -0,0 +1,133 @@
+import numpy as np
+
+
+DEFAULT_TYPE_WEIGHTS = {'Primary': 0.5, 'Secondary': 1.0, 'College': 1.5}
+
+
+def need_scores(family_income, institution_type, type_weights=None):
+    """Score each student's need from family income and institution type.
+
+    Income is ranked rather than scaled so a handful of extreme declarations
+    cannot flatten everyone else's score. The poorest student scores 1 and the
+    richest scores close to 0; students declaring the same income share the
+    average of their ranks, so they get the same score. The score is then
+    multiplied by the weight of the student's institution type.
+    """
+    income = np.asarray(family_income, dtype=np.float64)
+    n = income.size
+    if n == 0:
+        return np.zeros(0)
+
+    # Missing or negative incomes are treated as the highest declared income
+    valid = np.isfinite(income) & (income >= 0)
+    income = np.where(valid, income, income[valid].max(initial=0.0))
+    ordered = np.sort(income)
+    ranks = (np.searchsorted(ordered, income, 'left') + np.searchsorted(ordered, income, 'right') - 1) / 2
+    score = 1.0 - ranks / n
+
+    weights = type_weights or DEFAULT_TYPE_WEIGHTS
+    types = np.asarray(institution_type, dtype=object)
+    type_weight = np.ones(n)
+    for name, weight in weights.items():
+        type_weight[types == name] = weight
+    return score * type_weight
+
+
+def round_up_to_cents(amount):
+    # round() first so 0.29 * 100 = 28.999999999999996 stays 29 cents
+    return np.ceil(round(amount * 100, 6)) / 100
+
+
+def _fund_minimums(candidates, ward_index, type_index, budget, ward_caps, type_caps, min_award):
+    """Walk candidates in order, keeping each one whose minimum still fits.
+
+    Only students already kept count towards the budget and caps, so one
+    student skipped for a full ward does not hold back others. Stops as soon
+    as the budget cannot cover another minimum.
+    """
+    ward_used = [0] * ward_caps.size
+    type_used = [0] * type_caps.size
+    ward_caps, type_caps = ward_caps.tolist(), type_caps.tolist()
+    kept = []
+    for student, ward, kind in zip(candidates.tolist(), ward_index[candidates].tolist(), type_index[candidates].tolist()):
+        if (len(kept) + 1) * min_award > budget:
+            break
+        if (ward_used[ward] + 1) * min_award <= ward_caps[ward] and (type_used[kind] + 1) * min_award <= type_caps[kind]:
+            ward_used[ward] += 1
+            type_used[kind] += 1
+            kept.append(student)
+    return np.asarray(kept, dtype=np.int64)
+
+
+def allocate(scores, ward_index, type_index, budget, ward_caps, type_caps,
+             min_award=0.0, max_award=np.inf, max_iterations=50, tolerance=0.01):
+    """Split budget across students in proportion to need.
+
+    ward_index and type_index map each student to a ward and institution type
+    (integers from 0). ward_caps and type_caps are the largest totals each
+    ward and type may receive (use np.inf for no cap). Every funded student
+    gets between min_award (rounded up to whole cents) and max_award;
+    ValueError is raised when the rounded minimum exceeds max_award.
+
+    The highest-need students who fit within the budget and caps at
+    min_award are funded first. Whatever is left is then spread over them
+    in proportion to score. On every round each student's share is scaled
+    down to the tightest of its own, its ward's and its type's remaining
+    headroom. Each round saturates at least one constraint or spends the
+    budget, so a few rounds are enough even for hundreds of thousands of
+    students.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    ward_index = np.asarray(ward_index, dtype=np.int64)
+    type_index = np.asarray(type_index, dtype=np.int64)
+    ward_caps = np.asarray(ward_caps, dtype=np.float64)
+    type_caps = np.asarray(type_caps, dtype=np.float64)
+    n = scores.size
+    amounts = np.zeros(n)
+    if n == 0 or budget <= 0:
+        return amounts
+
+    # Fund the highest-need students whose minimum awards fit.
+    min_award = round_up_to_cents(min_award)
+    if min_award > max_award:
+        raise ValueError(f'min_award rounds up to {min_award:.2f}, which is more than max_award')
+    order = np.argsort(-scores, kind='stable')
+    candidates = order[scores[order] > 0]
+    if min_award > 0:
+        candidates = _fund_minimums(candidates, ward_index, type_index, budget, ward_caps, type_caps, min_award)
+    funded = np.zeros(n, dtype=bool)
+    funded[candidates] = True
+    amounts[funded] = min_award
+
+    for _ in range(max_iterations):
+        remaining = budget - amounts.sum()
+        if remaining <= tolerance:
+            break
+        student_room = np.where(funded, max_award - amounts, 0.0)
+        ward_room = ward_caps - np.bincount(ward_index, weights=amounts, minlength=ward_caps.size)
+        type_room = type_caps - np.bincount(type_index, weights=amounts, minlength=type_caps.size)
+        active = (student_room > tolerance) & (ward_room[ward_index] > tolerance) & (type_room[type_index] > tolerance)
+        if not active.any():
+            break
+
+        weight = np.where(active, scores, 0.0)
+        proposed = remaining * weight / weight.sum()
+        proposed = np.minimum(proposed, student_room)
+
+        ward_demand = np.bincount(ward_index, weights=proposed, minlength=ward_caps.size)
+        type_demand = np.bincount(type_index, weights=proposed, minlength=type_caps.size)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ward_scale = np.where(ward_demand > ward_room, ward_room / ward_demand, 1.0)
+            type_scale = np.where(type_demand > type_room, type_room / type_demand, 1.0)
+        proposed *= np.minimum(ward_scale[ward_index], type_scale[type_index])
+
+        step = proposed.sum()
+        amounts += proposed
+        if step <= tolerance:
+            break
+
+    # Round down to cents so rounding can never push a total over its cap.
+    # Every funded amount is at least the cent-rounded minimum, so the
+    # floor can only dip below it through float error and is lifted back.
+    rounded = np.floor(amounts * 100) / 100
+    return np.where(funded, np.maximum(rounded, min_award), rounded)
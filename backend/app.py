@@ -1,15 +1,64 @@
+import enum
+import hashlib
+import hmac
+import json
 import os
-from datetime import datetime, timedelta
-from flask import Flask, request, jsonify
+import random
+import threading
+import time
+import uuid
+
+import click
+from datetime import date, datetime, timedelta
+from functools import wraps
+from flask import Flask, Response, g, has_request_context, request, jsonify, make_response, send_from_directory, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_marshmallow import Marshmallow
 from flask_bcrypt import Bcrypt
 from flask_cors import CORS
-from flask_jwt_extended import jwt_required, create_access_token, get_jwt_identity, JWTManager
+from flask_jwt_extended import (
+    jwt_required, create_access_token, create_refresh_token, get_jwt, get_jwt_identity, get_jti,
+    verify_jwt_in_request, JWTManager
+)
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt.exceptions import PyJWTError
 from flask_mail import Mail, Message
-from marshmallow import pre_load, post_load, ValidationError
+from marshmallow import fields, pre_load, post_load, post_dump, ValidationError
+from werkzeug.middleware.proxy_fix import ProxyFix
 from werkzeug.utils import secure_filename
 from dotenv import load_dotenv
+from sqlalchemy import bindparam, delete, extract, func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased, joinedload, validates
+import numpy as np
+
+from archives import stream_zip
+from reports import stream_csv, stream_pdf_report
+from allocation import DEFAULT_TYPE_WEIGHTS, allocate, need_scores, round_up_to_cents
+from eligibility import RuleError, decode_value, evaluate as evaluate_rules, validate_rule
+
+from auth import ADMIN_ROLE, admin_required
+from backups import Backups
+from cache import create_cache
+from compression import Compress
+from cycles import CycleArchive
+from db_routing import RoutingSession, init_read_routing
+from documents import DocumentQueue
+from lookups import LookupTable, normalize_key
+from metrics import Metrics
+from migrations import upgrade_schema
+from profiling import RequestProfiler
+from pubsub import create_broker
+from ratelimit import AdmissionControl
+from structured_logging import init_logging
+
+if __name__ == '__main__':
+    # Document workers are spawned processes that re-import the main module,
+    # so run from serve.py: they then import that small module instead of
+    # building this whole app (logging, backups, broker) again.
+    import runpy
+    runpy.run_path(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'serve.py'), run_name='__main__')
+    raise SystemExit
 
 # Load environment variables
 load_dotenv()
@@ -28,6 +77,9 @@ app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'default-secret-key')
 # JWT Configuration
 app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY", "fallback-secret-key")
 app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(hours=1)
+app.config["JWT_REFRESH_TOKEN_EXPIRES"] = timedelta(days=int(os.getenv("JWT_REFRESH_TOKEN_DAYS", 14)))
+# EventSource cannot send headers, so the SSE endpoint takes ?jwt=<token>
+app.config["JWT_TOKEN_LOCATION"] = ["headers"]
 
 # Email Configuration
 app.config['MAIL_SERVER'] = os.getenv('MAIL_SERVER', 'smtp.gmail.com')
@@ -38,20 +90,179 @@ app.config['MAIL_PASSWORD'] = os.getenv('MAIL_PASSWORD')
 app.config['MAIL_DEFAULT_SENDER'] = os.getenv('MAIL_DEFAULT_SENDER')
 
 # CORS and Upload Configuration
-CORS(app, origins=["http://localhost:3000"], methods=["GET", "POST", "PUT", "DELETE"])
+CORS(app, origins=["http://localhost:3000"], methods=["GET", "POST", "PUT", "PATCH", "DELETE"], supports_credentials=True)
 
 # Upload Configuration
 UPLOAD_FOLDER = os.path.join(BASE_DIR, 'uploads')
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'pdf'}
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+app.config['UPLOAD_URL_TTL'] = int(os.getenv('UPLOAD_URL_TTL', 3600))
+# Let the front server send the bytes: X-Sendfile (Apache/lighttpd) or X-Accel-Redirect (nginx)
+app.config['USE_X_SENDFILE'] = os.getenv('USE_X_SENDFILE', 'false').lower() == 'true'
+app.config['UPLOAD_ACCEL_REDIRECT_PREFIX'] = os.getenv('UPLOAD_ACCEL_REDIRECT_PREFIX')
+
+# Bursary Cycle Configuration (closed cycles can be moved to ARCHIVE_FOLDER with `flask archive-cycle`)
+app.config['BURSARY_CYCLE'] = int(os.getenv('BURSARY_CYCLE', datetime.utcnow().year))
+app.config['ARCHIVE_FOLDER'] = os.path.join(BASE_DIR, 'archive')
+
+# Reference Data Configuration (set to true to reject constituencies and wards that are not already known)
+app.config['LOOKUP_STRICT_LOCATIONS'] = os.getenv('LOOKUP_STRICT_LOCATIONS', 'false').lower() == 'true'
+
+# Review Queue Configuration
+app.config['REVIEW_LEASE_MINUTES'] = int(os.getenv('REVIEW_LEASE_MINUTES', 15))
+app.config['REVIEW_CLAIM_LIMIT'] = int(os.getenv('REVIEW_CLAIM_LIMIT', 50))
+
+# Delta Sync Configuration (GET /applicants?since=<cursor>)
+app.config['SYNC_OVERLAP_SECONDS'] = float(os.getenv('SYNC_OVERLAP_SECONDS', 5))
+app.config['SYNC_TOMBSTONE_DAYS'] = int(os.getenv('SYNC_TOMBSTONE_DAYS', 30))
+
+# Read Routing Configuration (off by default; GET requests read from DATABASE_READ_URL or a read-only SQLite pool)
+app.config['DB_READ_ROUTING'] = os.getenv('DB_READ_ROUTING', 'false').lower() == 'true'
+app.config['DATABASE_READ_URL'] = os.getenv('DATABASE_READ_URL')
+app.config['DB_READ_POOL_SIZE'] = int(os.getenv('DB_READ_POOL_SIZE', 10))
+
+# Cache Configuration (CACHE_URL=redis://... or sqlite:///path shares the cache between workers)
+app.config['CACHE_URL'] = os.getenv('CACHE_URL')
+app.config['CACHE_MAX_ENTRIES'] = int(os.getenv('CACHE_MAX_ENTRIES', 2048))
+app.config['CACHE_TTL'] = int(os.getenv('CACHE_TTL', 300))
+# Invalidated keys cannot be re-cached for this long; cover replica lag (DB_READ_AFTER_WRITE_SECONDS)
+app.config['CACHE_TOMBSTONE_SECONDS'] = float(os.getenv('CACHE_TOMBSTONE_SECONDS', 5))
+
+# Admission Control Configuration (per-client token buckets and per-route concurrency limits)
+app.config['ADMISSION_CONTROL_ENABLED'] = os.getenv('ADMISSION_CONTROL_ENABLED', 'true').lower() == 'true'
+# Worker threads of the WSGI server; queued requests are rejected rather than tie up the last one (0 = no cap)
+app.config['SERVER_THREADS'] = int(os.getenv('SERVER_THREADS', 8))
+# Reverse proxies in front of the app; X-Forwarded-For is trusted for this many hops
+app.config['PROXY_FIX_HOPS'] = int(os.getenv('PROXY_FIX_HOPS', 0))
+# Password hashing is the most CPU-expensive work we do
+password_limits = {
+    'rate': float(os.getenv('LOGIN_RATE_PER_SECOND', 1)),
+    'burst': int(os.getenv('LOGIN_BURST', 20)),
+    'concurrency': int(os.getenv('LOGIN_CONCURRENCY', 4)),
+    'queue': int(os.getenv('LOGIN_QUEUE', 2)),
+    'wait': float(os.getenv('LOGIN_QUEUE_WAIT', 5)),
+}
+upload_limits = {
+    'rate': float(os.getenv('APPLY_RATE_PER_SECOND', 0.2)),
+    'burst': int(os.getenv('APPLY_BURST', 10)),
+    'concurrency': int(os.getenv('APPLY_CONCURRENCY', 8)),
+    'queue': int(os.getenv('APPLY_QUEUE', 2)),
+    'wait': float(os.getenv('APPLY_QUEUE_WAIT', 10)),
+}
+app.config['ADMISSION_LIMITS'] = {
+    'login': password_limits,
+    'register': password_limits,
+    'apply_for_bursary': upload_limits,
+    'update_applicant': upload_limits,
+}
+
+# Response Compression Configuration
+app.config['COMPRESS_MIN_SIZE'] = int(os.getenv('COMPRESS_MIN_SIZE', 1024))
+app.config['COMPRESS_LEVEL'] = int(os.getenv('COMPRESS_LEVEL', 6))
+app.config['COMPRESS_BR_LEVEL'] = int(os.getenv('COMPRESS_BR_LEVEL', 4))
+
+# Status Push Configuration (set PUBSUB_URL=redis://... to share events between workers)
+app.config['PUBSUB_URL'] = os.getenv('PUBSUB_URL')
+app.config['SSE_HEARTBEAT_SECONDS'] = int(os.getenv('SSE_HEARTBEAT_SECONDS', 15))
+
+# Document Validation Configuration
+app.config['DOCUMENT_WORKERS'] = int(os.getenv('DOCUMENT_WORKERS', 2))
+app.config['DOCUMENT_MAX_BYTES'] = int(os.getenv('DOCUMENT_MAX_BYTES', 5 * 1024 * 1024))
+app.config['DOCUMENT_MAX_DIMENSION'] = int(os.getenv('DOCUMENT_MAX_DIMENSION', 2000))
+app.config['DOCUMENT_MAX_PAGES'] = int(os.getenv('DOCUMENT_MAX_PAGES', 20))
+
+# Idempotency Configuration
+app.config['IDEMPOTENCY_TTL'] = timedelta(hours=int(os.getenv('IDEMPOTENCY_TTL_HOURS', 24)))
+
+# Profiling Configuration (opt-in)
+app.config['PROFILER_ENABLED'] = os.getenv('PROFILER_ENABLED', 'false').lower() == 'true'
+app.config['PROFILER_SAMPLE_RATE'] = float(os.getenv('PROFILER_SAMPLE_RATE', 0))
+app.config['PROFILER_SLOW_THRESHOLD'] = float(os.getenv('PROFILER_SLOW_THRESHOLD')) if os.getenv('PROFILER_SLOW_THRESHOLD') else None
+app.config['PROFILER_WATCH_RATE'] = float(os.getenv('PROFILER_WATCH_RATE', 0.1))
+app.config['PROFILER_DIR'] = os.path.join(BASE_DIR, 'logs', 'profiles')
+app.config['PROFILER_MAX_PROFILES'] = int(os.getenv('PROFILER_MAX_PROFILES', 100))
+
+# Backup Configuration (online SQLite backup plus uploads by content hash; `flask backup` takes one now)
+app.config['BACKUP_FOLDER'] = os.getenv('BACKUP_FOLDER', os.path.join(BASE_DIR, 'backups'))
+app.config['BACKUP_INTERVAL_MINUTES'] = int(os.getenv('BACKUP_INTERVAL_MINUTES', 0))  # 0 turns the scheduler off
+app.config['BACKUP_KEEP'] = int(os.getenv('BACKUP_KEEP', 14))
+# Pages copied per backup step; the database is only read-locked for one step at a time
+app.config['BACKUP_PAGES_PER_STEP'] = int(os.getenv('BACKUP_PAGES_PER_STEP', 256))
+app.config['BACKUP_STEP_PAUSE'] = float(os.getenv('BACKUP_STEP_PAUSE', 0.005))
+
+# Logging Configuration
+app.config['LOG_FILE'] = os.getenv('LOG_FILE', os.path.join(BASE_DIR, 'logs', 'bursary_app.log'))
+app.config['LOG_LEVEL'] = os.getenv('LOG_LEVEL', 'INFO')
+app.config['LOG_MAX_BYTES'] = int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024))
+app.config['LOG_BACKUP_COUNT'] = int(os.getenv('LOG_BACKUP_COUNT', 5))
+init_logging(app)
 
 # Initialize extensions
-db = SQLAlchemy(app)
+if app.config['PROXY_FIX_HOPS']:
+    hops = app.config['PROXY_FIX_HOPS']
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops, x_host=hops)
+db = SQLAlchemy(app, session_options={'class_': RoutingSession})
 ma = Marshmallow(app)
 bcrypt = Bcrypt(app)
 jwt = JWTManager(app)
 mail = Mail(app)
+init_read_routing(app, db)
+metrics = Metrics(app)
+cache = create_cache(app.config['CACHE_URL'], app.config['CACHE_MAX_ENTRIES'], app.config['CACHE_TTL'], metrics,
+                     app.config['CACHE_TOMBSTONE_SECONDS'])
+profiler = RequestProfiler(app, protect=admin_required)
+compress = Compress(app)
+admission_control = AdmissionControl(app, metrics)
+backups = Backups(app, db, metrics)
+broker = create_broker(app.config['PUBSUB_URL'])
+document_queue = DocumentQueue(
+    lambda job, report: record_document_report(job, report),
+    workers=app.config['DOCUMENT_WORKERS'],
+    options={
+        'max_bytes': app.config['DOCUMENT_MAX_BYTES'],
+        'max_dimension': app.config['DOCUMENT_MAX_DIMENSION'],
+        'max_pages': app.config['DOCUMENT_MAX_PAGES'],
+    }
+)
+metrics.gauge('sse_subscribers', 'Open status event streams in this process.',
+              function=lambda: {(): broker.subscriber_count()})
+
+class ApplicationStatus(str, enum.Enum):
+    PENDING = 'pending'
+    APPROVED = 'approved'
+    REJECTED = 'rejected'
+
+    def __str__(self):
+        return self.value
+
+    @classmethod
+    def parse(cls, value):
+        # Older clients send "Pending"/"Approved"
+        try:
+            return cls(str(value).strip().lower())
+        except ValueError:
+            raise ValueError(f"Invalid status {value!r}. Must be one of: pending, approved, rejected") from None
+
+def status_column_type():
+    # Stored as the lowercase value in a short VARCHAR, so existing rows and indexes keep working
+    return db.Enum(ApplicationStatus, native_enum=False, create_constraint=False, length=10,
+                   values_callable=lambda statuses: [status.value for status in statuses])
+
+# Accepted spellings of Applicant.dob; stored back as YYYY-MM-DD
+DOB_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%Y/%m/%d')
+
+def parse_dob(value):
+    for fmt in DOB_FORMATS:
+        try:
+            return datetime.strptime(str(value).strip(), fmt).date()
+        except ValueError:
+            continue
+    return None
+
+def validate_dob(value):
+    if parse_dob(value) is None:
+        raise ValidationError('Enter the date of birth as YYYY-MM-DD.')
 
 # Models
 class User(db.Model):
@@ -62,14 +273,41 @@ class User(db.Model):
     email = db.Column(db.String(100), unique=True, nullable=False)
     phone_number = db.Column(db.String(15), nullable=False)
     password = db.Column(db.String(200), nullable=False)
+    role = db.Column(db.String(20), nullable=False, server_default=db.text("'applicant'"))  # 'applicant' or 'admin'
+    applicants = db.relationship('Applicant', back_populates='user', order_by='Applicant.id')
+    application = db.relationship('BursaryApplication', back_populates='user', uselist=False)
+
+class Institution(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(100), unique=True, nullable=False)  # normalized name, see lookups.normalize_key
+    name = db.Column(db.String(100), nullable=False)
+
+class Constituency(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(100), unique=True, nullable=False)
+    name = db.Column(db.String(100), nullable=False)
+
+class Ward(db.Model):
+    __table_args__ = (db.UniqueConstraint('constituency_id', 'key'),)
+    id = db.Column(db.Integer, primary_key=True)
+    constituency_id = db.Column(db.Integer, db.ForeignKey('constituency.id'), nullable=False)
+    key = db.Column(db.String(100), nullable=False, index=True)
+    name = db.Column(db.String(100), nullable=False)
 
 class Applicant(db.Model):
+    __table_args__ = (
+        db.Index('ix_applicant_location', 'constituency_id', 'ward_id'),
+        db.Index('ix_applicant_cycle_location', 'cycle', 'constituency_id', 'ward_id'),
+        db.Index('ix_applicant_review_queue_location', 'status', 'constituency_id', 'ward_id', 'id'),
+        db.Index('ix_applicant_user', 'user_id', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     full_name = db.Column(db.String(100), nullable=False)
-    admission = db.Column(db.String(50), nullable=False)
+    admission = db.Column(db.String(50), nullable=False, index=True)
     gender = db.Column(db.String(10), nullable=False)
     form = db.Column(db.String(10), nullable=False)
     dob = db.Column(db.String(10), nullable=False)
+    birth_date = db.Column(db.Date, index=True)  # parsed from dob, used for age filters
     national_id = db.Column(db.String(20), nullable=False)
     phone_number = db.Column(db.String(15), nullable=False)
     email = db.Column(db.String(100), nullable=False)
@@ -80,9 +318,40 @@ class Applicant(db.Model):
     ward = db.Column(db.String(100), nullable=False)
     id_document = db.Column(db.String(200), nullable=True)
     birth_certificate = db.Column(db.String(200), nullable=True)
-    status = db.Column(db.String(10), default="Pending")
+    status = db.Column(status_column_type(), default=ApplicationStatus.PENDING)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    document_status = db.Column(db.String(20))  # pending, valid or invalid
+    document_report = db.Column(db.Text)  # JSON: field -> validation report
+    cycle = db.Column(db.Integer, default=lambda: app.config['BURSARY_CYCLE'])
+    claimed_by = db.Column(db.String(100))  # reviewer holding the lease
+    claim_expires_at = db.Column(db.DateTime)
+    # The name columns above keep the canonical spelling; grouping and filtering use these ids
+    institution_id = db.Column(db.Integer, db.ForeignKey('institution.id'), index=True)
+    constituency_id = db.Column(db.Integer, db.ForeignKey('constituency.id'))
+    ward_id = db.Column(db.Integer, db.ForeignKey('ward.id'))
+    # Set when the admission number matches a registered user, see link_users()
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    user = db.relationship('User', back_populates='applicants')
+    application = db.relationship(
+        'BursaryApplication', primaryjoin='foreign(Applicant.user_id) == remote(BursaryApplication.user_id)',
+        viewonly=True, uselist=False
+    )
+
+    @validates('dob')
+    def sync_birth_date(self, key, value):
+        self.birth_date = parse_dob(value)
+        return self.birth_date.isoformat() if self.birth_date else value
+
+class ApplicantTombstone(db.Model):
+    # Left behind by deletes so delta syncs can tell clients to drop the row
+    id = db.Column(db.Integer, primary_key=True)
+    applicant_id = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, nullable=False, index=True)
 
 class BursaryApplication(db.Model):
+    __table_args__ = (
+        db.Index('ix_bursary_application_cycle_status', 'cycle', 'status'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     admission_number = db.Column(db.String(50), unique=True, nullable=False)
     full_name = db.Column(db.String(100), nullable=False)
@@ -90,10 +359,94 @@ class BursaryApplication(db.Model):
     family_income = db.Column(db.Float, nullable=False)
     reason = db.Column(db.Text, nullable=False)
     supporting_documents = db.Column(db.String(255))
-    status = db.Column(db.String(20), default='pending')
-    application_date = db.Column(db.DateTime, default=datetime.utcnow)
-    review_date = db.Column(db.DateTime)
+    status = db.Column(status_column_type(), default=ApplicationStatus.PENDING, index=True)
+    application_date = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    review_date = db.Column(db.DateTime, index=True)
     reviewer_comments = db.Column(db.Text)
+    allocated_amount = db.Column(db.Float)
+    allocation_date = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    cycle = db.Column(db.Integer, default=lambda: app.config['BURSARY_CYCLE'])
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), index=True)
+    user = db.relationship('User', back_populates='application')
+
+class StatusEvent(db.Model):
+    # Append-only: rows are inserted on every status transition and never updated
+    __table_args__ = (
+        db.Index('ix_status_event_timeline', 'admission_number', 'created_at'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    admission_number = db.Column(db.String(50), nullable=False)
+    source = db.Column(db.String(20), nullable=False)  # 'application' or 'applicant'
+    status = db.Column(status_column_type(), nullable=False)
+    details = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    cycle = db.Column(db.Integer, default=lambda: app.config['BURSARY_CYCLE'], index=True)
+
+class RefreshToken(db.Model):
+    # Every refresh token issued; rotating one revokes it and records its replacement
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(36), unique=True, nullable=False)
+    family = db.Column(db.String(36), nullable=False, index=True)  # jti of the login that started the chain
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    created_at = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    revoked_at = db.Column(db.DateTime)
+    replaced_by = db.Column(db.String(36))
+
+class IdempotencyKey(db.Model):
+    __table_args__ = (db.UniqueConstraint('key', 'scope'),)
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(255), nullable=False)
+    scope = db.Column(db.String(255), nullable=False)  # "<METHOD> <path>"
+    fingerprint = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.Integer)  # NULL while the first request is still running
+    content_type = db.Column(db.String(100))
+    response_body = db.Column(db.LargeBinary)
+    created_at = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+class EligibilityRule(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)
+    field = db.Column(db.String(50), nullable=False)
+    operator = db.Column(db.String(10), nullable=False)
+    value = db.Column(db.Text, nullable=False)  # JSON encoded
+    enabled = db.Column(db.Boolean, default=True, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class EligibilityResult(db.Model):
+    __table_args__ = (db.UniqueConstraint('applicant_id', 'rule_id'),)
+    id = db.Column(db.Integer, primary_key=True)
+    applicant_id = db.Column(db.Integer, db.ForeignKey('applicant.id'), nullable=False, index=True)
+    rule_id = db.Column(db.Integer, db.ForeignKey('eligibility_rule.id'), nullable=False, index=True)
+    passed = db.Column(db.Boolean, nullable=False)
+    evaluated_at = db.Column(db.DateTime, nullable=False)
+
+class EligibilityRun(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    started_at = db.Column(db.DateTime, nullable=False)
+    finished_at = db.Column(db.DateTime)
+    full = db.Column(db.Boolean, default=False)
+    rows_evaluated = db.Column(db.Integer, default=0)
+
+# String indexes replaced by the integer location indexes above
+RETIRED_INDEXES = (
+    'ix_applicant_constituency_ward',
+    'ix_applicant_cycle_constituency_ward',
+    'ix_applicant_review_queue',
+)
+
+institutions = LookupTable(Institution)
+constituencies = LookupTable(Constituency)
+wards = LookupTable(Ward, parent_column='constituency_id')
+
+cycle_archive = CycleArchive(
+    app.config['ARCHIVE_FOLDER'],
+    [Applicant.__table__, BursaryApplication.__table__, StatusEvent.__table__],
+    app
+)
 
 # Schemas
 class UserSchema(ma.SQLAlchemyAutoSchema):
@@ -106,6 +459,13 @@ class ApplicantSchema(ma.SQLAlchemyAutoSchema):
     class Meta:
         model = Applicant
 
+    dob = fields.String(required=True, validate=validate_dob)
+    status = fields.Enum(ApplicationStatus, by_value=True, dump_only=True)
+
+    def __init__(self, *args, sign_urls=True, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sign_urls = sign_urls
+
     @pre_load
     def format_data(self, data, **kwargs):
         return {
@@ -144,19 +504,567 @@ class ApplicantSchema(ma.SQLAlchemyAutoSchema):
             'ward': data['ward'],
             'idDocument': data.get('id_document'),
             'birthCertificate': data.get('birth_certificate'),
-            'status': data.get('status', 'Pending'),
+            'status': data.get('status', ApplicationStatus.PENDING),
         }
 
+    @post_dump
+    def sign_document_urls(self, data, **kwargs):
+        return sign_applicant_documents(data) if self.sign_urls else data
+
 # Initialize schemas
 user_schema = UserSchema()
 users_schema = UserSchema(many=True)
 applicant_schema = ApplicantSchema()
 applicants_schema = ApplicantSchema(many=True)
+# Cached applicants are stored unsigned and signed per response
+applicant_record_schema = ApplicantSchema(sign_urls=False)
+
+# Fields eligibility rules may test; 'age' is derived from dob
+ELIGIBILITY_FIELDS = {
+    'gender': Applicant.gender,
+    'form': Applicant.form,
+    'dob': Applicant.dob,
+    'institution_type': Applicant.institution_type,
+    'institution_name': Applicant.institution_name,
+    'constituency': Applicant.constituency,
+    'ward': Applicant.ward,
+    'family_income': BursaryApplication.family_income,
+}
 
 # Helper Functions
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+# Left out of stored request fingerprints: an unsalted hash of a password can be brute-forced
+SECRET_FIELDS = ('password', 'token', 'secret')
+
+def is_secret_field(name):
+    return any(secret in name.lower() for secret in SECRET_FIELDS)
+
+def request_fingerprint():
+    # Uploaded files are identified by name only; hashing their bytes would cost
+    # as much as the work idempotency is meant to save
+    body = request.get_json(silent=True)
+    if isinstance(body, dict):
+        body = {name: value for name, value in body.items() if not is_secret_field(name)}
+    digest = hashlib.sha256()
+    digest.update(json.dumps(body, sort_keys=True).encode())
+    digest.update(json.dumps(sorted(
+        (name, value) for name, value in request.form.items(multi=True) if not is_secret_field(name)
+    )).encode())
+    digest.update(json.dumps(sorted((name, f.filename) for name, f in request.files.items(multi=True))).encode())
+    return digest.hexdigest()
+
+def idempotent(view):
+    """Replay the stored response when a request repeats its Idempotency-Key."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > 255:
+            return jsonify({"success": False, "message": "Idempotency-Key is too long"}), 400
+
+        scope = f'{request.method} {request.path}'
+        fingerprint = request_fingerprint()
+        now = datetime.utcnow()
+
+        # Claim the key first so concurrent retries cannot both run the view
+        record = IdempotencyKey(
+            key=key,
+            scope=scope,
+            fingerprint=fingerprint,
+            created_at=now,
+            expires_at=now + app.config['IDEMPOTENCY_TTL']
+        )
+        db.session.add(record)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            existing = IdempotencyKey.query.filter_by(key=key, scope=scope).first()
+            if existing is not None and existing.expires_at < now:
+                db.session.delete(existing)
+                db.session.commit()
+                return wrapper(*args, **kwargs)
+            if existing is None or existing.fingerprint != fingerprint:
+                return jsonify({
+                    "success": False,
+                    "message": "Idempotency-Key was already used with a different request"
+                }), 422
+            if existing.status_code is None:
+                response = jsonify({
+                    "success": False,
+                    "message": "A request with this Idempotency-Key is still being processed"
+                })
+                response.status_code = 409
+                response.headers['Retry-After'] = '1'
+                return response
+            response = make_response(existing.response_body, existing.status_code)
+            response.content_type = existing.content_type
+            response.headers['Idempotent-Replayed'] = 'true'
+            return response
+
+        record_id = record.id
+        try:
+            response = make_response(view(*args, **kwargs))
+        except Exception:
+            IdempotencyKey.query.filter_by(id=record_id).delete()
+            db.session.commit()
+            raise
+
+        if response.status_code >= 500:
+            # Let the client retry failures for real
+            IdempotencyKey.query.filter_by(id=record_id).delete()
+        else:
+            IdempotencyKey.query.filter_by(id=record_id).update({
+                'status_code': response.status_code,
+                'content_type': response.content_type,
+                'response_body': response.get_data()
+            })
+        if random.random() < 0.01:
+            IdempotencyKey.query.filter(IdempotencyKey.expires_at < now).delete()
+        db.session.commit()
+        return response
+    return wrapper
+
+DOCUMENT_FIELDS = ('id_document', 'birth_certificate')
+document_lock = threading.Lock()
+
+def upload_signature(key, expires):
+    message = f'{key}:{expires}'.encode()
+    return hmac.new(app.config['SECRET_KEY'].encode(), message, hashlib.sha256).hexdigest()
+
+def signed_upload_url(url):
+    # Expiry is rounded up to a TTL boundary so the same document keeps the
+    # same URL for a while and responses that embed it stay cacheable
+    ttl = app.config['UPLOAD_URL_TTL']
+    expires = (int(time.time()) // ttl + 2) * ttl
+    key = url.rsplit('/', 1)[-1]
+    return f'{url}?expires={expires}&signature={upload_signature(key, expires)}'
+
+def document_reader():
+    """Who may get signed document URLs in this request: 'admin', an admission number, or None.
+
+    Signed URLs work without a token, so they only go to administrators and
+    to the applicant the documents belong to.
+    """
+    if '_document_reader' not in g:
+        reader = None
+        try:
+            verify_jwt_in_request(optional=True)
+            identity = get_jwt_identity()
+        except (JWTExtendedException, PyJWTError):
+            identity = None
+        if identity is not None:
+            if get_jwt().get('role') == ADMIN_ROLE:
+                reader = ADMIN_ROLE
+            else:
+                user = cached_user(identity)
+                reader = user['admission_number'] if user else None
+        g._document_reader = reader
+    return g._document_reader
+
+def sign_applicant_documents(data):
+    # Everyone else keeps the plain /uploads URL, which asks for the owner's token
+    if not has_request_context() or document_reader() not in (ADMIN_ROLE, data.get('admission')):
+        return data
+    for field in DOCUMENT_FIELDS:
+        if data.get(field):
+            data[field] = signed_upload_url(data[field])
+    return data
+
+def upload_path(url):
+    return os.path.join(app.config['UPLOAD_FOLDER'], url.rsplit('/', 1)[-1])
+
+def mark_documents_pending(applicant, fields):
+    # Called before commit whenever new files replace an applicant's documents
+    reports = json.loads(applicant.document_report or '{}')
+    for field in fields:
+        reports.pop(field, None)
+    applicant.document_report = json.dumps(reports)
+    applicant.document_status = 'pending'
+
+def queue_document_checks(applicant_id, fields, urls):
+    for field, url in zip(fields, urls):
+        document_queue.submit((applicant_id, field), upload_path(url))
+
+def record_document_report(job, report):
+    applicant_id, field = job
+    with app.app_context(), document_lock:
+        applicant = db.session.get(Applicant, applicant_id)
+        if applicant is None:
+            return
+        reports = json.loads(applicant.document_report or '{}')
+        reports[field] = report
+        expected = [name for name in DOCUMENT_FIELDS if getattr(applicant, name)]
+        if all(name in reports for name in expected):
+            status = 'valid' if all(reports[name]['valid'] for name in expected) else 'invalid'
+        else:
+            status = 'pending'
+        applicant.document_report = json.dumps(reports)
+        applicant.document_status = status
+        db.session.commit()
+        invalidate_applicant(applicant_id)
+        if not report['valid']:
+            app.logger.warning('Document failed validation',
+                               extra={'applicant_id': applicant_id, 'field': field, 'errors': report['errors']})
+
+def requeue_pending_documents():
+    # Jobs live in memory, so anything still pending after a restart is resubmitted
+    for applicant in Applicant.query.filter_by(document_status='pending').all():
+        reports = json.loads(applicant.document_report or '{}')
+        fields = [name for name in DOCUMENT_FIELDS if getattr(applicant, name) and name not in reports]
+        queue_document_checks(applicant.id, fields, [getattr(applicant, name) for name in fields])
+
+USER_CACHE_FIELDS = ('id', 'full_name', 'admission_number', 'institution_name', 'email', 'phone_number')
+
+def cached_user(user_id):
+    def load():
+        user = db.session.get(User, user_id)
+        return {field: getattr(user, field) for field in USER_CACHE_FIELDS} if user else None
+    return cache.get_or_load('user', user_id, load)
+
+def cached_applicant(applicant_id):
+    def load():
+        applicant = db.session.get(Applicant, applicant_id)
+        return applicant_record_schema.dump(applicant) if applicant else None
+    return cache.get_or_load('applicant', applicant_id, load)
+
+def cached_latest_applicant(admission):
+    # The admission entry only maps to the id of the newest Applicant row
+    applicant_id = cache.get_or_load('applicant_admission', admission, lambda: db.session.scalar(
+        select(func.max(Applicant.id)).where(Applicant.admission == admission)
+    ))
+    return cached_applicant(applicant_id) if applicant_id is not None else None
+
+def invalidate_applicant(applicant_id, *admissions):
+    # Call after commit. The tombstones stop readers that loaded the old row
+    # (before the commit, or from a lagging replica) from caching it again.
+    cache.invalidate('applicant', applicant_id)
+    cache.invalidate('applicant_admission', *admissions)
+
+def issue_tokens(user_id, family=None):
+    # Identities are strings: PyJWT rejects a numeric "sub" claim
+    identity = str(user_id)
+    family = family or str(uuid.uuid4())
+    refresh_token = create_refresh_token(identity=identity, additional_claims={'family': family})
+    # The role rides in the access token so admin checks need no query
+    role = db.session.scalar(select(User.role).where(User.id == int(user_id)))
+    now = datetime.utcnow()
+    db.session.add(RefreshToken(
+        jti=get_jti(refresh_token),
+        family=family,
+        user_id=int(user_id),
+        created_at=now,
+        expires_at=now + app.config['JWT_REFRESH_TOKEN_EXPIRES']
+    ))
+    return create_access_token(identity=identity, additional_claims={'role': role}), refresh_token
+
+def revoke_token_family(family):
+    RefreshToken.query.filter(
+        RefreshToken.family == family,
+        RefreshToken.revoked_at.is_(None)
+    ).update({'revoked_at': datetime.utcnow()}, synchronize_session=False)
+
+@jwt.token_in_blocklist_loader
+def is_token_revoked(jwt_header, jwt_payload):
+    # Access tokens expire within the hour and are not tracked, so they cost no query
+    if jwt_payload.get('type') != 'refresh':
+        return False
+    token = RefreshToken.query.filter_by(jti=jwt_payload['jti']).first()
+    if token is None:
+        return True
+    if token.revoked_at is not None and token.replaced_by is not None:
+        # A token that was already rotated came back, so it has been copied: end the session
+        revoke_token_family(token.family)
+        db.session.commit()
+    return token.revoked_at is not None
+
+def record_status_event(admission_number, status, details=None, source='application'):
+    # Added to the caller's session so the event commits atomically with the change
+    event = StatusEvent(
+        admission_number=admission_number,
+        source=source,
+        status=status,
+        details=details,
+        created_at=datetime.utcnow()
+    )
+    db.session.add(event)
+    return event
+
+def status_event_to_dict(event):
+    return {
+        "id": event.id,
+        "date": event.created_at.isoformat(),
+        "source": event.source,
+        "status": event.status,
+        "details": event.details or f"Status changed to {event.status}"
+    }
+
+def publish_status_event(event):
+    # Call after commit so subscribers never see an event that was rolled back
+    broker.publish(event.admission_number, status_event_to_dict(event))
+
+def resolve_references(institution_name, constituency, ward):
+    """Map submitted names to reference rows, returning ids and canonical names.
+
+    New institutions are always added. New constituencies and wards are added
+    too unless LOOKUP_STRICT_LOCATIONS is set, in which case they are rejected.
+    """
+    create_locations = not app.config['LOOKUP_STRICT_LOCATIONS']
+    institution = institutions.resolve(db.session, institution_name)
+    constituency_entry = constituencies.resolve(db.session, constituency, create=create_locations)
+    if constituency_entry is None:
+        raise ValidationError({'constituency': [f'Unknown constituency: {constituency}']})
+    ward_entry = wards.resolve(db.session, ward, parent_id=constituency_entry[0], create=create_locations)
+    if ward_entry is None:
+        raise ValidationError({'ward': [f'Unknown ward in {constituency_entry[1]}: {ward}']})
+    return {
+        'institution_id': institution[0] if institution else None,
+        'institution_name': institution[1] if institution else institution_name,
+        'constituency_id': constituency_entry[0],
+        'constituency': constituency_entry[1],
+        'ward_id': ward_entry[0],
+        'ward': ward_entry[1],
+    }
+
+def location_conditions(filters):
+    # Filter on the integer ids so spelling variants match and the location indexes are used
+    conditions = []
+    if filters.get('constituency'):
+        conditions.append(Applicant.constituency_id.in_(db.session.scalars(
+            select(Constituency.id).where(Constituency.key == normalize_key(filters['constituency']))
+        ).all()))
+    if filters.get('ward'):
+        conditions.append(Applicant.ward_id.in_(db.session.scalars(
+            select(Ward.id).where(Ward.key == normalize_key(filters['ward']))
+        ).all()))
+    return conditions
+
+def years_before(day, years):
+    try:
+        return day.replace(year=day.year - years)
+    except ValueError:  # 29 February
+        return day.replace(year=day.year - years, day=28)
+
+def filter_date(filters, name):
+    try:
+        return date.fromisoformat(filters[name]) if filters.get(name) else None
+    except ValueError:
+        raise ValueError(f'{name} must be a date (YYYY-MM-DD)') from None
+
+def date_range_conditions(filters):
+    """Age and application/review date windows as indexed range conditions.
+
+    min_age/max_age become a birth_date range. applied_from/applied_to and
+    reviewed_from/reviewed_to (inclusive dates) select admissions through
+    the BursaryApplication date indexes. Raises ValueError on bad input.
+    """
+    conditions = []
+    today = date.today()
+    try:
+        min_age = int(filters['min_age']) if filters.get('min_age') else None
+        max_age = int(filters['max_age']) if filters.get('max_age') else None
+    except ValueError:
+        raise ValueError('min_age and max_age must be whole numbers') from None
+    if min_age is not None:
+        conditions.append(Applicant.birth_date <= years_before(today, min_age))
+    if max_age is not None:
+        conditions.append(Applicant.birth_date > years_before(today, max_age + 1))
+
+    windows = []
+    for column, prefix in ((BursaryApplication.application_date, 'applied'), (BursaryApplication.review_date, 'reviewed')):
+        start = filter_date(filters, f'{prefix}_from')
+        end = filter_date(filters, f'{prefix}_to')
+        if start is not None:
+            windows.append(column >= datetime.combine(start, datetime.min.time()))
+        if end is not None:
+            windows.append(column < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+    if windows:
+        conditions.append(Applicant.admission.in_(select(BursaryApplication.admission_number).where(*windows)))
+    return conditions
+
+def backfill_lookups(renormalize=False):
+    """Point applicants at the reference tables and rewrite their names to the canonical spelling.
+
+    Only rows without ids are touched unless renormalize is set. Returns the
+    number of distinct (institution, constituency, ward) combinations seen.
+    """
+    query = select(Applicant.institution_name, Applicant.constituency, Applicant.ward).distinct()
+    if not renormalize:
+        query = query.where(or_(
+            Applicant.institution_id.is_(None),
+            Applicant.constituency_id.is_(None),
+            Applicant.ward_id.is_(None)
+        ))
+    combinations = db.session.execute(query).all()
+    db.session.rollback()  # end the read so lookup inserts can commit on their own connection
+    if not combinations:
+        return 0
+
+    updates = []
+    for institution_name, constituency, ward in combinations:
+        institution = institutions.resolve(db.session, institution_name)
+        constituency_entry = constituencies.resolve(db.session, constituency)
+        ward_entry = wards.resolve(db.session, ward, parent_id=constituency_entry[0]) if constituency_entry else None
+        if institution is None or constituency_entry is None or ward_entry is None:
+            continue  # blank names stay unlinked
+        updates.append({
+            'old_institution_name': institution_name,
+            'old_constituency': constituency,
+            'old_ward': ward,
+            'new_institution_id': institution[0],
+            'new_institution_name': institution[1],
+            'new_constituency_id': constituency_entry[0],
+            'new_constituency': constituency_entry[1],
+            'new_ward_id': ward_entry[0],
+            'new_ward': ward_entry[1],
+        })
+    if updates:
+        table = Applicant.__table__
+        db.session.execute(
+            update(table).where(
+                table.c.institution_name == bindparam('old_institution_name'),
+                table.c.constituency == bindparam('old_constituency'),
+                table.c.ward == bindparam('old_ward')
+            ).values(
+                institution_id=bindparam('new_institution_id'),
+                institution_name=bindparam('new_institution_name'),
+                constituency_id=bindparam('new_constituency_id'),
+                constituency=bindparam('new_constituency'),
+                ward_id=bindparam('new_ward_id'),
+                ward=bindparam('new_ward')
+            ),
+            updates
+        )
+        db.session.commit()
+    return len(combinations)
+
+def requested_cycle():
+    return request.args.get('cycle', type=int)
+
+def cycle_session(cycle):
+    # Archived cycles are read from their own file; everything else is live
+    if cycle is not None and cycle != app.config['BURSARY_CYCLE'] and cycle_archive.has(cycle):
+        return cycle_archive.session(cycle)
+    return db.session
+
+def backfill_cycles():
+    # Rows created before the cycle column existed take the year they were submitted in
+    active = app.config['BURSARY_CYCLE']
+    db.session.execute(
+        update(BursaryApplication).where(BursaryApplication.cycle.is_(None)).values(
+            cycle=func.coalesce(extract('year', BursaryApplication.application_date), active)
+        )
+    )
+    application_cycle = select(BursaryApplication.cycle).where(
+        BursaryApplication.admission_number == Applicant.admission
+    ).scalar_subquery()
+    db.session.execute(
+        update(Applicant).where(Applicant.cycle.is_(None)).values(
+            cycle=func.coalesce(application_cycle, extract('year', Applicant.updated_at), active)
+        )
+    )
+    db.session.execute(
+        update(StatusEvent).where(StatusEvent.cycle.is_(None)).values(
+            cycle=func.coalesce(extract('year', StatusEvent.created_at), active)
+        )
+    )
+    db.session.commit()
+
+def backfill_typed_columns():
+    """Parse dob into birth_date and fold status spellings onto the enum values.
+
+    Runs before anything loads statuses through the ORM: a value outside the
+    enum could not be read back, so unknown statuses become pending (and are
+    logged). Returns (dates parsed, dates left unparsed, statuses reset).
+    """
+    for model in (Applicant, BursaryApplication, StatusEvent):
+        column = model.__table__.c.status
+        db.session.execute(
+            update(model.__table__).where(column != func.lower(func.trim(column)))
+            .values(status=func.lower(func.trim(column)))
+        )
+    reset = 0
+    for model in (Applicant, BursaryApplication, StatusEvent):
+        column = model.__table__.c.status
+        reset += db.session.execute(
+            update(model.__table__)
+            .where(or_(column.is_(None), column.notin_([status.value for status in ApplicationStatus])))
+            .values(status=ApplicationStatus.PENDING.value)
+        ).rowcount
+    if reset:
+        app.logger.warning('Reset unknown statuses to pending', extra={'rows': reset})
+
+    table = Applicant.__table__
+    rows = db.session.execute(
+        select(table.c.id, table.c.dob).where(table.c.birth_date.is_(None), table.c.dob.is_not(None))
+    ).all()
+    updates = []
+    for applicant_id, dob in rows:
+        birth_date = parse_dob(dob)
+        if birth_date is not None:
+            updates.append({'row_id': applicant_id, 'new_dob': birth_date.isoformat(), 'new_birth_date': birth_date})
+    if updates:
+        db.session.execute(
+            update(table).where(table.c.id == bindparam('row_id'))
+            .values(dob=bindparam('new_dob'), birth_date=bindparam('new_birth_date')),
+            updates
+        )
+    db.session.commit()
+    return len(updates), len(rows) - len(updates), reset
+
+def user_id_for(admission, email=None):
+    # Both lookups hit a unique index; the admission number wins over the email
+    user_id = db.session.scalar(select(User.id).where(User.admission_number == admission))
+    if user_id is None and email:
+        user_id = db.session.scalar(select(User.id).where(User.email == email))
+    return user_id
+
+def link_users(user=None):
+    """Set user_id on applicants and applications that are not linked yet.
+
+    Rows are matched to the user with the same admission number, or failing
+    that the same email. With user given, only that user's rows are looked
+    at (used right after registration). Returns the number of rows linked.
+    """
+    linked = 0
+    for model, admission in ((Applicant, Applicant.admission), (BursaryApplication, BursaryApplication.admission_number)):
+        match = func.coalesce(
+            select(User.id).where(User.admission_number == admission).scalar_subquery(),
+            select(User.id).where(User.email == model.email).scalar_subquery()
+        )
+        query = update(model).where(model.user_id.is_(None), match.is_not(None))
+        if user is not None:
+            query = query.where(or_(admission == user.admission_number, model.email == user.email))
+        linked += db.session.execute(
+            query.values(user_id=match).execution_options(synchronize_session=False)
+        ).rowcount
+    db.session.commit()
+    return linked
+
+def with_accounts(query):
+    # One query with LEFT JOINs on the user_id foreign keys instead of a lookup per row
+    return query.options(joinedload(Applicant.user), joinedload(Applicant.application))
+
+def account_summary(applicant):
+    user, application = applicant.user, applicant.application
+    return {
+        "account": {
+            "id": user.id,
+            "full_name": user.full_name,
+            "email": user.email,
+            "phone_number": user.phone_number
+        } if user else None,
+        "application": {
+            "status": application.status,
+            "application_date": application.application_date.isoformat() if application.application_date else None,
+            "review_date": application.review_date.isoformat() if application.review_date else None,
+            "allocated_amount": application.allocated_amount
+        } if application else None
+    }
+
 def send_status_update_email(email, status, comments=None):
     try:
         if status == 'pending':
@@ -207,14 +1115,21 @@ def send_status_update_email(email, status, comments=None):
             recipients=[email],
             body=body
         )
-        mail.send(msg)
+        started = time.perf_counter()
+        try:
+            mail.send(msg)
+        except Exception:
+            metrics.observe_smtp(time.perf_counter() - started, ok=False)
+            raise
+        metrics.observe_smtp(time.perf_counter() - started)
         return True
-    except Exception as e:
-        print(f"Email sending failed: {e}")
+    except Exception:
+        app.logger.exception('Email sending failed', extra={'recipient': email, 'status': status})
         return False
 
 # Routes
 @app.route('/register', methods=['POST'])
+@idempotent
 def register():
     try:
         data = request.get_json()
@@ -242,6 +1157,8 @@ def register():
 
         db.session.add(new_user)
         db.session.commit()
+        # Applications submitted before registering belong to this user too
+        link_users(new_user)
 
         return jsonify({'message': 'User registered successfully'}), 201
 
@@ -270,32 +1187,78 @@ def login():
             'full_name': user.full_name,
             'admission_number': user.admission_number,
             'institution_name': user.institution_name,
+            'role': user.role,
         }
 
-        access_token = create_access_token(identity=user.id)
+        access_token, refresh_token = issue_tokens(user.id)
+        db.session.commit()
         return jsonify({
             'message': 'Login successful',
             'access_token': access_token,
+            'refresh_token': refresh_token,
             'user_data': user_data
         }), 200
 
     except Exception as e:
-        print(f"Login error: {str(e)}")  # Server-side logging
+        app.logger.exception('Login error')
         return jsonify({'error': 'Login failed', 'message': str(e)}), 500
 
+@app.route('/auth/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+def refresh_access_token():
+    try:
+        claims = get_jwt()
+        access_token, refresh_token = issue_tokens(get_jwt_identity(), claims['family'])
+        # Conditional update so that of two concurrent refreshes only one can rotate the token
+        rotated = db.session.execute(
+            update(RefreshToken)
+            .where(RefreshToken.jti == claims['jti'], RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=datetime.utcnow(), replaced_by=get_jti(refresh_token))
+        ).rowcount
+        if not rotated:
+            db.session.rollback()
+            revoke_token_family(claims['family'])
+            db.session.commit()
+            return jsonify({'error': 'Token has been revoked'}), 401
+
+        if random.random() < 0.01:
+            RefreshToken.query.filter(RefreshToken.expires_at < datetime.utcnow()).delete()
+        db.session.commit()
+        return jsonify({
+            'access_token': access_token,
+            'refresh_token': refresh_token
+        }), 200
+    except Exception as e:
+        db.session.rollback()
+        app.logger.exception('Token refresh error')
+        return jsonify({'error': 'Token refresh failed', 'message': str(e)}), 500
+
+@app.route('/auth/logout', methods=['POST'])
+@jwt_required(refresh=True)
+def logout():
+    try:
+        revoke_token_family(get_jwt()['family'])
+        db.session.commit()
+        return jsonify({'message': 'Logged out'}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/auth/user', methods=['GET'])
 @jwt_required()
 def get_user_profile():
     try:
         current_user_id = get_jwt_identity()
-        user = User.query.get_or_404(current_user_id)
+        user = cached_user(current_user_id)
+        if user is None:
+            return jsonify({'error': 'User not found'}), 404
         
         user_data = {
-            'full_name': user.full_name,
-            'admission_number': user.admission_number,
-            'institution_name': user.institution_name,
-            'email': user.email,
-            'phone_number': user.phone_number
+            'full_name': user['full_name'],
+            'admission_number': user['admission_number'],
+            'institution_name': user['institution_name'],
+            'email': user['email'],
+            'phone_number': user['phone_number']
         }
         
         return jsonify(user_data), 200
@@ -303,13 +1266,71 @@ def get_user_profile():
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/me/dashboard', methods=['GET'])
+@jwt_required()
+def get_dashboard():
+    try:
+        current_user_id = get_jwt_identity()
+        # Only the newest Applicant row per user is shown (a max over ix_applicant_user)
+        newer = aliased(Applicant)
+        latest_applicant_id = select(func.max(newer.id)).where(newer.user_id == User.id).scalar_subquery()
+
+        rows = db.session.execute(
+            select(User, BursaryApplication, Applicant, StatusEvent)
+            .outerjoin(BursaryApplication, BursaryApplication.user_id == User.id)
+            .outerjoin(Applicant, Applicant.id == latest_applicant_id)
+            .outerjoin(StatusEvent, StatusEvent.admission_number == User.admission_number)
+            .where(User.id == current_user_id)
+            .order_by(StatusEvent.created_at)
+        ).all()
+        if not rows:
+            return jsonify({"error": "User not found"}), 404
+
+        user, application, applicant, _ = rows[0]
+        history = [status_event_to_dict(event) for _, _, _, event in rows if event is not None]
+
+        payload = {
+            "profile": {
+                "full_name": user.full_name,
+                "admission_number": user.admission_number,
+                "institution_name": user.institution_name,
+                "email": user.email,
+                "phone_number": user.phone_number
+            },
+            "application": {
+                "status": application.status,
+                "application_date": application.application_date.isoformat() if application.application_date else None,
+                "review_date": application.review_date.isoformat() if application.review_date else None,
+                "reviewer_comments": application.reviewer_comments,
+                "allocated_amount": application.allocated_amount
+            } if application else {"status": "not_applied"},
+            "applicant": applicant_schema.dump(applicant) if applicant else None,
+            "documents": {
+                "id_document": bool(applicant and applicant.id_document),
+                "birth_certificate": bool(applicant and applicant.birth_certificate),
+                "status": applicant.document_status if applicant else None,
+                "report": json.loads(applicant.document_report) if applicant and applicant.document_report else {}
+            },
+            "history": history
+        }
+
+        response = jsonify(payload)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        response.add_etag()
+        return response.make_conditional(request)
+    except Exception as e:
+        app.logger.exception('Error in get_dashboard')
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/apply', methods=['POST'])
+@idempotent
 def apply_for_bursary():
     try:
         data = request.form
         errors = applicant_schema.validate(data)
         if errors:
             return jsonify(errors), 400
+        references = resolve_references(data['institutionName'], data['constituency'], data['ward'])
 
         # Handle file uploads
         id_document_file = request.files.get('idDocument')
@@ -336,16 +1357,24 @@ def apply_for_bursary():
             phone_number=data['phoneNumber'],
             email=data['email'],
             institution_type=data['institutionType'],
-            institution_name=data['institutionName'],
             index_number=data.get('indexNumber', ''),
-            constituency=data['constituency'],
-            ward=data['ward'],
+            user_id=user_id_for(data['admission'], data['email']),
+            **references,
             id_document=f'http://localhost:5000/uploads/{id_document_filename}' if id_document_filename else None,
             birth_certificate=f'http://localhost:5000/uploads/{birth_certificate_filename}' if birth_certificate_filename else None
         )
 
+        uploaded = [field for field in DOCUMENT_FIELDS if getattr(new_applicant, field)]
+        if uploaded:
+            mark_documents_pending(new_applicant, uploaded)
+
         db.session.add(new_applicant)
+        record_status_event(new_applicant.admission, ApplicationStatus.PENDING, 'Applicant details submitted', source='applicant')
         db.session.commit()
+        invalidate_applicant(new_applicant.id, new_applicant.admission)
+
+        # Validation and normalization happen off the request path
+        queue_document_checks(new_applicant.id, uploaded, [getattr(new_applicant, field) for field in uploaded])
 
         return applicant_schema.jsonify(new_applicant), 201
 
@@ -356,6 +1385,7 @@ def apply_for_bursary():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/update-bursary-status', methods=['POST'])
+@idempotent
 def update_bursary_status():
     try:
         data = request.json
@@ -368,8 +1398,9 @@ def update_bursary_status():
             }), 400
         
         # Validate status
-        valid_statuses = ['pending', 'approved', 'rejected']
-        if data['status'] not in valid_statuses:
+        try:
+            status = ApplicationStatus.parse(data['status'])
+        except ValueError:
             return jsonify({
                 "success": False, 
                 "message": "Invalid status. Must be one of: pending, approved, rejected"
@@ -387,15 +1418,22 @@ def update_bursary_status():
             }), 404
         
         # Update status
-        application.status = data['status']
+        application.status = status
         application.review_date = datetime.utcnow()
         
         # Optional reviewer comments
         if 'reviewer_comments' in data:
             application.reviewer_comments = data['reviewer_comments']
+
+        event = record_status_event(
+            application.admission_number,
+            application.status,
+            data.get('reviewer_comments')
+        )
         
         # Commit changes
         db.session.commit()
+        publish_status_event(event)
         
         # Send email notification
         send_status_update_email(
@@ -422,10 +1460,12 @@ def get_bursary_status(admission_number):
     try:
         # Check user's permission to access this data
         current_user_id = get_jwt_identity()
-        current_user = User.query.get_or_404(current_user_id)
+        current_user = cached_user(current_user_id)
+        if current_user is None:
+            return jsonify({"error": "User not found"}), 404
         
         # Verify the admission number matches the current user
-        if current_user.admission_number != admission_number:
+        if current_user['admission_number'] != admission_number:
             return jsonify({
                 "error": "Unauthorized access to application status",
                 "message": "You can only view your own application status"
@@ -445,12 +1485,25 @@ def get_bursary_status(admission_number):
             }), 200
         
         
+        # ix_status_event_timeline finds this applicant's events already in
+        # date order; status, source and details are read from the table rows
+        events = db.session.execute(
+            select(StatusEvent.created_at, StatusEvent.source, StatusEvent.status, StatusEvent.details)
+            .where(StatusEvent.admission_number == admission_number)
+            .order_by(StatusEvent.created_at)
+        ).all()
+
+        # Events can predate the application (e.g. an earlier applicant record),
+        # so the submission is merged into the timeline by date
+        submitted = (application.application_date, "application", "pending", "Application submitted")
         history = [
             {
-                "date": application.application_date.isoformat(),
-                "status": application.status,
-                "details": application.reviewer_comments or "Application submitted"
+                "date": created_at.isoformat(),
+                "source": source,
+                "status": status,
+                "details": details or f"Status changed to {status}"
             }
+            for created_at, source, status, details in sorted([submitted, *events], key=lambda event: event[0])
         ]
         
         return jsonify({
@@ -459,28 +1512,225 @@ def get_bursary_status(admission_number):
         }), 200
     
     except Exception as e:
-        print(f"Error in get_bursary_status: {str(e)}")  # Server-side logging
+        app.logger.exception('Error in get_bursary_status', extra={'admission_number': admission_number})
         return jsonify({
             "error": "Internal server error",
             "message": str(e)
         }), 500
 
+@app.route('/events/status', methods=['GET'])
+@admission_control.exempt
+@jwt_required(locations=['headers', 'query_string'])  # EventSource cannot send headers, so ?jwt= works here only
+def stream_status_events():
+    current_user = cached_user(get_jwt_identity())
+    if current_user is None:
+        return not_found(None)
+    admission_number = current_user['admission_number']
+    subscription = broker.subscribe(admission_number)
+
+    # Replay anything the client missed while disconnected
+    missed = []
+    last_event_id = request.headers.get('Last-Event-ID', request.args.get('last_event_id'))
+    if last_event_id and last_event_id.isdigit():
+        missed = StatusEvent.query.filter(
+            StatusEvent.admission_number == admission_number,
+            StatusEvent.id > int(last_event_id)
+        ).order_by(StatusEvent.id).all()
+    missed = [status_event_to_dict(event) for event in missed]
+    heartbeat = app.config['SSE_HEARTBEAT_SECONDS']
+
+    def format_event(message):
+        return f"id: {message['id']}\nevent: status\ndata: {json.dumps(message)}\n\n"
+
+    def stream():
+        try:
+            yield 'retry: 5000\n\n'
+            for message in missed:
+                yield format_event(message)
+            while True:
+                message = subscription.get(timeout=heartbeat)
+                if message is None:
+                    yield ': ping\n\n'
+                else:
+                    yield format_event(message)
+        finally:
+            subscription.close()
+
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+def can_read_upload(key):
+    expires = request.args.get('expires', '')
+    signature = request.args.get('signature', '')
+    if expires.isdigit() and signature:
+        return int(expires) >= time.time() and hmac.compare_digest(signature, upload_signature(key, int(expires)))
+
+    # Otherwise the applicant who uploaded the file may read it with their token
+    verify_jwt_in_request()
+    user = cached_user(get_jwt_identity())
+    if user is None:
+        return False
+    latest = cached_latest_applicant(user['admission_number'])
+    if latest and any(latest.get(field) and latest[field].rsplit('/', 1)[-1] == key for field in DOCUMENT_FIELDS):
+        return True
+    for applicant in Applicant.query.filter_by(admission=user['admission_number']).all():
+        for field in DOCUMENT_FIELDS:
+            url = getattr(applicant, field)
+            if url and url.rsplit('/', 1)[-1] == key:
+                return True
+    return False
+
+@app.route('/uploads/<key>', methods=['GET'])
+def serve_upload(key):
+    if key != secure_filename(key) or not can_read_upload(key):
+        return jsonify({
+            "success": False,
+            "message": "You do not have access to this document"
+        }), 403
+
+    accel_prefix = app.config['UPLOAD_ACCEL_REDIRECT_PREFIX']
+    if accel_prefix:
+        if not os.path.isfile(os.path.join(app.config['UPLOAD_FOLDER'], key)):
+            return not_found(None)
+        # nginx serves the file itself, including Range and conditional requests
+        response = Response(mimetype=None)
+        response.headers['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + key
+        response.headers.pop('Content-Type', None)
+        return response
+
+    # send_from_directory handles Range, ETag and If-Modified-Since, and hands the
+    # file to wsgi.file_wrapper (or X-Sendfile) instead of copying it in Python
+    response = send_from_directory(app.config['UPLOAD_FOLDER'], key, conditional=True, max_age=3600)
+    response.headers['Cache-Control'] = 'private, max-age=3600'
+    return response
+
 @app.route('/applicants', methods=['GET'])
 def get_applicants():
     try:
-        applicants = Applicant.query.all()
-        return applicants_schema.jsonify(applicants)
+        if 'since' in request.args:
+            return sync_applicants(request.args['since'])
+        query = filtered_applicants_query()
+        if request.args.get('expand') == 'account':
+            if cycle_session(requested_cycle()) is not db.session:
+                return jsonify({
+                    "success": False,
+                    "message": "Accounts are not kept with archived cycles"
+                }), 400
+            applicants = with_accounts(query).all()
+            return jsonify([
+                dict(record, **account_summary(applicant))
+                for record, applicant in zip(applicants_schema.dump(applicants), applicants)
+            ])
+        return applicants_schema.jsonify(query.all())
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "message": str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             "success": False,
             "message": f"Error retrieving applicants: {str(e)}"
         }), 500
 
+def sync_applicants(since):
+    """Rows changed or deleted since the cursor, plus the cursor for the next call.
+
+    The next cursor trails the server clock by SYNC_OVERLAP_SECONDS, so a
+    row stamped just before a sync but committed just after it is picked up
+    by the following sync. Clients upsert by id, so rows seen twice are
+    harmless. An empty or expired cursor returns everything.
+    """
+    retention = timedelta(days=app.config['SYNC_TOMBSTONE_DAYS'])
+    try:
+        cursor = datetime.fromisoformat(since) if since else None
+    except ValueError:
+        return jsonify({
+            "success": False,
+            "message": "Invalid since cursor"
+        }), 400
+    now = datetime.utcnow()
+    reset = cursor is None or cursor < now - retention
+    next_cursor = now - timedelta(seconds=app.config['SYNC_OVERLAP_SECONDS'])
+
+    query = filtered_applicants_query()
+    deleted = []
+    if not reset:
+        query = query.filter(Applicant.updated_at > cursor)
+        deleted = db.session.scalars(
+            select(ApplicantTombstone.applicant_id).where(ApplicantTombstone.deleted_at > cursor)
+        ).all()
+        next_cursor = max(cursor, next_cursor)
+
+    return jsonify({
+        "reset": reset,
+        "applicants": applicants_schema.dump(query.all()),
+        "deleted": sorted(set(deleted)),
+        "cursor": next_cursor.isoformat()
+    })
+
+def record_tombstones(applicant_ids):
+    now = datetime.utcnow()
+    if applicant_ids:
+        db.session.execute(insert(ApplicantTombstone), [
+            {'applicant_id': applicant_id, 'deleted_at': now} for applicant_id in applicant_ids
+        ])
+    if random.random() < 0.01:
+        ApplicantTombstone.query.filter(
+            ApplicantTombstone.deleted_at < now - timedelta(days=app.config['SYNC_TOMBSTONE_DAYS'])
+        ).delete()
+
+def latest_applicant_ids():
+    # Applicants may submit more than once; only the newest row per admission counts
+    return select(func.max(Applicant.id)).group_by(Applicant.admission)
+
+def filtered_applicants_query():
+    cycle = requested_cycle()
+    query = cycle_session(cycle).query(Applicant)
+    if cycle is not None:
+        query = query.filter(Applicant.cycle == cycle)
+    query = query.filter(*location_conditions(request.args), *date_range_conditions(request.args))
+    if request.args.get('status'):
+        query = query.filter(Applicant.status == ApplicationStatus.parse(request.args['status']))
+    return query
+
+@app.route('/applicants/documents.zip', methods=['GET'])
+@admin_required
+def download_applicant_documents():
+    try:
+        query = filtered_applicants_query()
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    query = query.with_entities(
+        Applicant.id, Applicant.admission, Applicant.ward,
+        Applicant.id_document, Applicant.birth_certificate
+    ).order_by(Applicant.ward_id, Applicant.id).execution_options(yield_per=500)
+
+    def entries():
+        for applicant_id, admission, ward, id_document, birth_certificate in query:
+            folder = f"{secure_filename(ward) or 'unknown-ward'}/{applicant_id}-{secure_filename(admission)}"
+            for field, url in (('id_document', id_document), ('birth_certificate', birth_certificate)):
+                if url:
+                    path = upload_path(url)
+                    yield f"{folder}/{field}.{path.rsplit('.', 1)[-1].lower()}", path
+
+    name_parts = [secure_filename(request.args[field]) for field in ('constituency', 'ward', 'status') if request.args.get(field)]
+    filename = '-'.join(['documents'] + name_parts) + '.zip'
+    return Response(
+        stream_with_context(stream_zip(entries())),
+        mimetype='application/zip',
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
 @app.route('/applicants/<int:id>', methods=['GET'])
 def get_single_applicant(id):
     try:
-        applicant = Applicant.query.get_or_404(id)
-        return applicant_schema.jsonify(applicant)
+        applicant = cached_applicant(id)
+        if applicant is None:
+            return not_found(None)
+        return jsonify(sign_applicant_documents(dict(applicant)))
     except Exception as e:
         return jsonify({
             "success": False,
@@ -488,13 +1738,29 @@ def get_single_applicant(id):
         }), 500
 
 @app.route('/applicants/<int:id>', methods=['PUT'])
+@idempotent
 def update_application_status(id):
     try:
         applicant = Applicant.query.get_or_404(id)
-        status = request.json.get('status', applicant.status)
+        try:
+            status = ApplicationStatus.parse(request.json.get('status', applicant.status))
+        except ValueError as e:
+            return jsonify({
+                "success": False,
+                "message": str(e)
+            }), 400
+        event = None
+        if status != applicant.status:
+            event = record_status_event(applicant.admission, status, source='applicant')
+            # A reviewed applicant leaves the review queue
+            applicant.claimed_by = None
+            applicant.claim_expires_at = None
         applicant.status = status
 
         db.session.commit()
+        invalidate_applicant(id, applicant.admission)
+        if event is not None:
+            publish_status_event(event)
         
         # Optional: Send email notification about status change
         send_status_update_email(applicant.email, status)
@@ -511,8 +1777,12 @@ def update_application_status(id):
 def delete_application(id):
     try:
         applicant = Applicant.query.get_or_404(id)
+        admission = applicant.admission
+        EligibilityResult.query.filter_by(applicant_id=id).delete()
         db.session.delete(applicant)
+        record_tombstones([id])
         db.session.commit()
+        invalidate_applicant(id, admission)
 
         return jsonify({
             "success": True,
@@ -526,6 +1796,7 @@ def delete_application(id):
         }), 500
 
 @app.route('/applicants/<int:id>/update', methods=['PUT'])
+@idempotent
 def update_applicant(id):
     try:
         applicant = Applicant.query.get_or_404(id)
@@ -535,6 +1806,8 @@ def update_applicant(id):
         if errors:
             return jsonify(errors), 400
 
+        previous_admission = applicant.admission
+
         # Update the applicant details
         applicant.full_name = data['fullName']
         applicant.admission = data['admission']
@@ -545,28 +1818,39 @@ def update_applicant(id):
         applicant.phone_number = data['phoneNumber']
         applicant.email = data['email']
         applicant.institution_type = data['institutionType']
-        applicant.institution_name = data['institutionName']
         applicant.index_number = data.get('indexNumber', '')
-        applicant.constituency = data['constituency']
-        applicant.ward = data['ward']
+        applicant.user_id = user_id_for(applicant.admission, applicant.email)
+        for field, value in resolve_references(data['institutionName'], data['constituency'], data['ward']).items():
+            setattr(applicant, field, value)
 
         # Handle file uploads if provided
         id_document_file = request.files.get('idDocument')
         birth_certificate_file = request.files.get('birthCertificate')
+        uploaded = []
 
         if id_document_file and allowed_file(id_document_file.filename):
             id_document_filename = secure_filename(id_document_file.filename)
             id_document_file.save(os.path.join(app.config['UPLOAD_FOLDER'], id_document_filename))
             applicant.id_document = f'http://localhost:5000/uploads/{id_document_filename}'
+            uploaded.append('id_document')
 
         if birth_certificate_file and allowed_file(birth_certificate_file.filename):
             birth_certificate_filename = secure_filename(birth_certificate_file.filename)
             birth_certificate_file.save(os.path.join(app.config['UPLOAD_FOLDER'], birth_certificate_filename))
             applicant.birth_certificate = f'http://localhost:5000/uploads/{birth_certificate_filename}'
+            uploaded.append('birth_certificate')
+
+        if uploaded:
+            mark_documents_pending(applicant, uploaded)
 
         db.session.commit()
+        invalidate_applicant(id, previous_admission, applicant.admission)
+        queue_document_checks(applicant.id, uploaded, [getattr(applicant, field) for field in uploaded])
 
         return applicant_schema.jsonify(applicant)
+    except ValidationError as err:
+        db.session.rollback()
+        return jsonify(err.messages), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({
@@ -574,6 +1858,625 @@ def update_applicant(id):
             "message": f"Error updating applicant: {str(e)}"
         }), 500
 
+def review_queue_filter(filters, claimable_at=None):
+    # Only the active cycle is reviewed; closed cycles wait to be archived
+    conditions = [
+        Applicant.status == ApplicationStatus.PENDING,
+        Applicant.cycle == app.config['BURSARY_CYCLE'],
+    ] + location_conditions(filters)
+    if claimable_at is not None:
+        conditions.append(or_(Applicant.claim_expires_at.is_(None), Applicant.claim_expires_at < claimable_at))
+    return conditions
+
+@app.route('/review-queue', methods=['GET'])
+@admin_required
+def get_review_queue():
+    now = datetime.utcnow()
+    unclaimed = db.session.scalar(select(func.count(Applicant.id)).where(*review_queue_filter(request.args, now)))
+    claimed = db.session.execute(
+        select(Applicant.claimed_by, func.count(Applicant.id))
+        .where(*review_queue_filter(request.args), Applicant.claim_expires_at >= now)
+        .group_by(Applicant.claimed_by)
+    ).all()
+    return jsonify({
+        "unclaimed": unclaimed,
+        "claimed": {reviewer: count for reviewer, count in claimed}
+    }), 200
+
+@app.route('/review-queue/claim', methods=['POST'])
+@admin_required
+def claim_review_batch():
+    try:
+        data = request.json or {}
+        # Leases belong to the signed-in reviewer, never to a name from the body
+        reviewer = get_jwt_identity()
+        limit = min(int(data.get('limit', 10)), app.config['REVIEW_CLAIM_LIMIT'])
+        lease = timedelta(minutes=int(data.get('lease_minutes', app.config['REVIEW_LEASE_MINUTES'])))
+        now = datetime.utcnow()
+
+        # One conditional UPDATE ... RETURNING: the row check and the claim happen
+        # together, so concurrent reviewers never receive the same applicant
+        candidates = select(Applicant.id).where(*review_queue_filter(data, now)).order_by(Applicant.id).limit(limit)
+        claimed = db.session.execute(
+            update(Applicant)
+            .where(
+                Applicant.id.in_(candidates.with_for_update(skip_locked=True).scalar_subquery()),
+                or_(Applicant.claim_expires_at.is_(None), Applicant.claim_expires_at < now)
+            )
+            .values(claimed_by=reviewer, claim_expires_at=now + lease)
+            .returning(Applicant)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        db.session.commit()
+        for applicant in claimed:
+            invalidate_applicant(applicant.id)
+
+        return jsonify({
+            "success": True,
+            "lease_expires_at": (now + lease).isoformat(),
+            "applicants": applicants_schema.dump(sorted(claimed, key=lambda applicant: applicant.id))
+        }), 200
+    except (TypeError, ValueError) as e:
+        return jsonify({
+            "success": False,
+            "message": f"Invalid input: {str(e)}"
+        }), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            "success": False,
+            "message": f"Error claiming applicants: {str(e)}"
+        }), 500
+
+@app.route('/review-queue/release', methods=['POST'])
+@admin_required
+def release_review_claims():
+    try:
+        data = request.json or {}
+        reviewer = get_jwt_identity()
+        query = update(Applicant).where(
+            Applicant.claimed_by == reviewer, Applicant.cycle == app.config['BURSARY_CYCLE']
+        )
+        if data.get('ids'):
+            ids = [int(i) for i in data['ids']]
+            held_by_others = db.session.scalar(
+                select(func.count(Applicant.id))
+                .where(Applicant.id.in_(ids), Applicant.claimed_by.is_not(None), Applicant.claimed_by != reviewer)
+            )
+            if held_by_others:
+                return jsonify({
+                    "success": False,
+                    "message": "Some of these applicants are claimed by another reviewer"
+                }), 403
+            query = query.where(Applicant.id.in_(ids))
+        released = db.session.execute(
+            query.values(claimed_by=None, claim_expires_at=None).returning(Applicant.id)
+        ).scalars().all()
+        db.session.commit()
+        for applicant_id in released:
+            invalidate_applicant(applicant_id)
+        return jsonify({
+            "success": True,
+            "released": len(released)
+        }), 200
+    except (TypeError, ValueError) as e:
+        return jsonify({
+            "success": False,
+            "message": f"Invalid input: {str(e)}"
+        }), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            "success": False,
+            "message": f"Error releasing applicants: {str(e)}"
+        }), 500
+
+@app.route('/allocations', methods=['POST'])
+@admin_required
+def run_allocation():
+    try:
+        data = request.json or {}
+        if 'budget' not in data:
+            return jsonify({
+                "success": False,
+                "message": "Invalid input. budget is required."
+            }), 400
+
+        budget = float(data['budget'])
+        min_award = float(data.get('min_award', 0))
+        max_award = float(data['max_award']) if data.get('max_award') is not None else np.inf
+        # Awards are paid in whole cents, so compare the minimum as it will be paid
+        if budget <= 0 or min_award < 0 or max_award < round_up_to_cents(min_award):
+            return jsonify({
+                "success": False,
+                "message": "Invalid input. Need budget > 0 and 0 <= min_award <= max_award, in whole cents."
+            }), 400
+
+        # Latest Applicant row per admission number supplies ward and institution type
+        rows = db.session.query(
+            BursaryApplication.id,
+            BursaryApplication.family_income,
+            Applicant.ward_id,
+            Applicant.ward,
+            Applicant.institution_type,
+        ).outerjoin(
+            Applicant,
+            (Applicant.admission == BursaryApplication.admission_number) & Applicant.id.in_(latest_applicant_ids()),
+        ).filter(
+            BursaryApplication.status == ApplicationStatus.APPROVED,
+            BursaryApplication.cycle == app.config['BURSARY_CYCLE']
+        ).all()
+
+        if not rows:
+            return jsonify({
+                "success": True,
+                "message": "No approved applications to allocate",
+                "funded": 0,
+                "allocated_total": 0
+            }), 200
+
+        ids, incomes, ward_ids, wards, types = zip(*rows)
+        ids = np.fromiter(ids, dtype=np.int64, count=len(ids))
+        incomes = np.array(incomes, dtype=np.float64)
+        types = np.array([kind or '' for kind in types], dtype=object)
+        # Wards are grouped by id: different constituencies can have wards with the same name
+        ward_keys, ward_index = np.unique(
+            np.fromiter((ward_id or 0 for ward_id in ward_ids), dtype=np.int64, count=len(ward_ids)),
+            return_inverse=True
+        )
+        ward_names = dict(zip((ward_id or 0 for ward_id in ward_ids), (ward or '' for ward in wards)))
+        type_names, type_index = np.unique(types, return_inverse=True)
+
+        # Caps are keyed by ward id; a ward name caps each ward of that name separately
+        default_ward_cap = data.get('default_ward_cap')
+        default_ward_cap = np.inf if default_ward_cap is None else default_ward_cap
+        ward_caps = data.get('ward_caps', {})
+        ward_cap_array = np.array([
+            float(ward_caps.get(str(key), ward_caps.get(ward_names[key], default_ward_cap)))
+            for key in ward_keys.tolist()
+        ])
+        # Institution-type quotas are fractions of the budget
+        type_quotas = data.get('type_quotas', {})
+        type_cap_array = np.array([float(type_quotas.get(name, 1.0)) * budget for name in type_names])
+
+        scores = need_scores(incomes, types, data.get('type_weights') or DEFAULT_TYPE_WEIGHTS)
+        amounts = allocate(
+            scores, ward_index, type_index, budget,
+            ward_cap_array, type_cap_array,
+            min_award=min_award, max_award=max_award,
+        )
+
+        if not data.get('dry_run'):
+            allocated_at = datetime.utcnow()
+            db.session.execute(update(BursaryApplication), [
+                {'id': int(app_id), 'allocated_amount': float(amount), 'allocation_date': allocated_at}
+                for app_id, amount in zip(ids, amounts)
+            ])
+            db.session.commit()
+
+        ward_totals = np.bincount(ward_index, weights=amounts, minlength=len(ward_keys))
+        type_totals = np.bincount(type_index, weights=amounts, minlength=len(type_names))
+        return jsonify({
+            "success": True,
+            "dry_run": bool(data.get('dry_run')),
+            "funded": int((amounts > 0).sum()),
+            "allocated_total": round(float(amounts.sum()), 2),
+            "unallocated": round(budget - float(amounts.sum()), 2),
+            "by_ward": [
+                {"ward_id": key or None, "ward": ward_names[key], "allocated": round(float(total), 2)}
+                for key, total in zip(ward_keys.tolist(), ward_totals)
+            ],
+            "by_institution_type": {str(name): round(float(total), 2) for name, total in zip(type_names, type_totals)},
+            "allocations": [
+                {"id": int(app_id), "amount": float(amount)}
+                for app_id, amount in zip(ids, amounts)
+            ] if data.get('dry_run') else None
+        }), 200
+
+    except (TypeError, ValueError) as e:
+        return jsonify({
+            "success": False,
+            "message": f"Invalid input: {str(e)}"
+        }), 400
+    except Exception as e:
+        db.session.rollback()
+        app.logger.exception('Error running allocation')
+        return jsonify({
+            "success": False,
+            "message": f"Error running allocation: {str(e)}"
+        }), 500
+
+def rule_to_dict(rule):
+    return {
+        "id": rule.id,
+        "name": rule.name,
+        "field": rule.field,
+        "operator": rule.operator,
+        "value": decode_value(rule.value),
+        "enabled": rule.enabled,
+        "updated_at": rule.updated_at.isoformat() if rule.updated_at else None
+    }
+
+@app.route('/eligibility/rules', methods=['GET'])
+def get_eligibility_rules():
+    rules = EligibilityRule.query.order_by(EligibilityRule.id).all()
+    return jsonify([rule_to_dict(rule) for rule in rules]), 200
+
+@app.route('/eligibility/rules', methods=['POST'])
+def create_eligibility_rule():
+    try:
+        data = request.json or {}
+        if not all(key in data for key in ['name', 'field', 'operator', 'value']):
+            return jsonify({
+                "success": False,
+                "message": "Invalid input. name, field, operator and value are required."
+            }), 400
+        validate_rule(data['field'], data['operator'], data['value'], ELIGIBILITY_FIELDS)
+
+        rule = EligibilityRule(
+            name=data['name'],
+            field=data['field'],
+            operator=data['operator'],
+            value=json.dumps(data['value']),
+            enabled=data.get('enabled', True)
+        )
+        db.session.add(rule)
+        db.session.commit()
+        return jsonify(rule_to_dict(rule)), 201
+    except RuleError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            "success": False,
+            "message": f"Error creating rule: {str(e)}"
+        }), 500
+
+@app.route('/eligibility/rules/<int:id>', methods=['PUT'])
+def update_eligibility_rule(id):
+    try:
+        rule = EligibilityRule.query.get_or_404(id)
+        data = request.json or {}
+        field = data.get('field', rule.field)
+        operator = data.get('operator', rule.operator)
+        value = data['value'] if 'value' in data else decode_value(rule.value)
+        validate_rule(field, operator, value, ELIGIBILITY_FIELDS)
+
+        rule.name = data.get('name', rule.name)
+        rule.field = field
+        rule.operator = operator
+        rule.value = json.dumps(value)
+        rule.enabled = data.get('enabled', rule.enabled)
+        # Touch the rule even if nothing changed so the next run re-evaluates it
+        rule.updated_at = datetime.utcnow()
+        db.session.commit()
+        return jsonify(rule_to_dict(rule)), 200
+    except RuleError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            "success": False,
+            "message": f"Error updating rule: {str(e)}"
+        }), 500
+
+@app.route('/eligibility/rules/<int:id>', methods=['DELETE'])
+def delete_eligibility_rule(id):
+    try:
+        rule = EligibilityRule.query.get_or_404(id)
+        EligibilityResult.query.filter_by(rule_id=id).delete()
+        db.session.delete(rule)
+        db.session.commit()
+        return jsonify({
+            "success": True,
+            "message": "Rule deleted successfully"
+        }), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            "success": False,
+            "message": f"Error deleting rule: {str(e)}"
+        }), 500
+
+def _store_eligibility_results(ids, outcomes, rules, evaluated_at):
+    if not len(ids) or not rules:
+        return
+    rule_ids = [rule.id for rule in rules]
+    # Chunk the IN list to stay under SQLite's bound-parameter limit
+    for start in range(0, len(ids), 500):
+        chunk = [int(i) for i in ids[start:start + 500]]
+        db.session.execute(delete(EligibilityResult).where(
+            EligibilityResult.applicant_id.in_(chunk),
+            EligibilityResult.rule_id.in_(rule_ids)
+        ))
+    db.session.execute(insert(EligibilityResult), [
+        {
+            'applicant_id': int(applicant_id),
+            'rule_id': rule_id,
+            'passed': bool(passed),
+            'evaluated_at': evaluated_at
+        }
+        for applicant_id, row in zip(ids, outcomes)
+        for rule_id, passed in zip(rule_ids, row)
+    ])
+
+@app.route('/eligibility/run', methods=['POST'])
+def run_eligibility():
+    try:
+        started_at = datetime.utcnow()
+        rules = EligibilityRule.query.filter_by(enabled=True).order_by(EligibilityRule.id).all()
+        last_run = EligibilityRun.query.filter(
+            EligibilityRun.finished_at.isnot(None)
+        ).order_by(EligibilityRun.started_at.desc()).first()
+        full = request.args.get('full', 'false').lower() == 'true' or last_run is None
+
+        base_query = select(Applicant.id).outerjoin(
+            BursaryApplication, BursaryApplication.admission_number == Applicant.admission
+        )
+        if full:
+            changed_rules, unchanged_rules = rules, []
+        else:
+            watermark = last_run.started_at
+            changed_rules = [rule for rule in rules if rule.updated_at is None or rule.updated_at >= watermark]
+            unchanged_rules = [rule for rule in rules if rule not in changed_rules]
+
+        evaluated = 0
+        if changed_rules:
+            ids, outcomes = evaluate_rules(db.session, base_query, Applicant.id, changed_rules, ELIGIBILITY_FIELDS)
+            _store_eligibility_results(ids, outcomes, changed_rules, started_at)
+            evaluated = len(ids)
+        if unchanged_rules:
+            touched = base_query.where(or_(
+                Applicant.updated_at.is_(None),
+                Applicant.updated_at >= watermark,
+                BursaryApplication.updated_at >= watermark
+            ))
+            ids, outcomes = evaluate_rules(db.session, touched, Applicant.id, unchanged_rules, ELIGIBILITY_FIELDS)
+            _store_eligibility_results(ids, outcomes, unchanged_rules, started_at)
+            evaluated = max(evaluated, len(ids))
+
+        run = EligibilityRun(
+            started_at=started_at,
+            finished_at=datetime.utcnow(),
+            full=full,
+            rows_evaluated=evaluated
+        )
+        db.session.add(run)
+        db.session.commit()
+
+        return jsonify({
+            "success": True,
+            "full": full,
+            "rules_evaluated": len(changed_rules) + len(unchanged_rules),
+            "rows_evaluated": evaluated,
+            "duration_ms": round((run.finished_at - started_at).total_seconds() * 1000, 1)
+        }), 200
+    except RuleError as e:
+        db.session.rollback()
+        return jsonify({"success": False, "message": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        app.logger.exception('Error running eligibility rules')
+        return jsonify({
+            "success": False,
+            "message": f"Error running eligibility rules: {str(e)}"
+        }), 500
+
+@app.route('/applicants/<int:id>/eligibility', methods=['GET'])
+def get_applicant_eligibility(id):
+    Applicant.query.get_or_404(id)
+    results = db.session.query(EligibilityResult, EligibilityRule).join(
+        EligibilityRule, EligibilityRule.id == EligibilityResult.rule_id
+    ).filter(EligibilityResult.applicant_id == id).order_by(EligibilityRule.id).all()
+    return jsonify({
+        "applicant_id": id,
+        "eligible": all(result.passed for result, _ in results) if results else None,
+        "rules": [
+            {
+                "rule_id": rule.id,
+                "name": rule.name,
+                "passed": result.passed,
+                "evaluated_at": result.evaluated_at.isoformat()
+            }
+            for result, rule in results
+        ]
+    }), 200
+
+REPORT_COLUMNS = [
+    ('No.', 30, 'left'),
+    ('Student', 150, 'left'),
+    ('Admission', 80, 'left'),
+    ('School', 175, 'left'),
+    ('Amount (KES)', 80, 'right'),
+]
+
+@app.route('/reports/approvals.<fmt>', methods=['GET'])
+@admin_required
+def approval_report(fmt):
+    if fmt not in ('pdf', 'csv'):
+        return not_found(None)
+
+    try:
+        status = ApplicationStatus.parse(request.args.get('status', 'approved'))
+        date_ranges = date_range_conditions(request.args)
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    cycle = requested_cycle()
+    query = select(
+        Applicant.constituency,
+        Applicant.ward,
+        Applicant.full_name,
+        Applicant.admission,
+        Applicant.institution_name,
+        BursaryApplication.allocated_amount
+    ).join(
+        BursaryApplication, BursaryApplication.admission_number == Applicant.admission
+    ).where(
+        BursaryApplication.status == status,
+        Applicant.id.in_(latest_applicant_ids())
+    )
+    if cycle is not None:
+        query = query.where(Applicant.cycle == cycle, BursaryApplication.cycle == cycle)
+    query = query.where(*location_conditions(request.args), *date_ranges)
+    # Ordered by the location index so rows arrive grouped per ward
+    query = query.order_by(Applicant.constituency_id, Applicant.ward_id, Applicant.full_name)
+
+    def rows():
+        result = cycle_session(cycle).execute(query.execution_options(yield_per=500))
+        for constituency, ward, full_name, admission, school, amount in result:
+            yield constituency, ward, full_name, admission, school, amount
+
+    name_parts = [secure_filename(request.args[field]) for field in ('cycle', 'constituency', 'ward') if request.args.get(field)]
+    filename = '-'.join([f'{secure_filename(status)}-students'] + name_parts) + f'.{fmt}'
+    headers = {'Content-Disposition': f'attachment; filename="{filename}"'}
+
+    if fmt == 'csv':
+        body = stream_csv(
+            ['constituency', 'ward', 'full_name', 'admission', 'institution_name', 'allocated_amount'],
+            rows()
+        )
+        return Response(stream_with_context(body), mimetype='text/csv', headers=headers)
+
+    def pdf_rows():
+        number = 0
+        current = None
+        for constituency, ward, full_name, admission, school, amount in rows():
+            group = f'{ward} ({constituency})'
+            number = number + 1 if group == current else 1
+            current = group
+            yield group, [str(number), full_name, admission, school, amount]
+
+    title = f'{status.capitalize()} bursary applications'
+    body = stream_pdf_report(title, REPORT_COLUMNS, pdf_rows())
+    return Response(stream_with_context(body), mimetype='application/pdf', headers=headers)
+
+@app.route('/admin/cache/clear', methods=['POST'])
+@admin_required
+def clear_cache():
+    # Without CACHE_URL every worker process has its own cache; this clears the one serving the request
+    cache.clear()
+    return jsonify({"success": True, "shared": cache.shared}), 200
+
+@app.route('/backups', methods=['GET'])
+@admin_required
+def get_backups():
+    # Reports of the snapshots still kept, oldest first
+    return jsonify({"snapshots": backups.store.reports()}), 200
+
+@app.route('/lookups', methods=['GET'])
+def get_lookups():
+    # Canonical spellings for the application form
+    ward_rows = db.session.execute(select(Ward.constituency_id, Ward.name).order_by(Ward.name)).all()
+    wards_by_constituency = {}
+    for constituency_id, name in ward_rows:
+        wards_by_constituency.setdefault(constituency_id, []).append(name)
+    response = jsonify({
+        "institutions": db.session.scalars(select(Institution.name).order_by(Institution.name)).all(),
+        "constituencies": [
+            {"name": constituency.name, "wards": wards_by_constituency.get(constituency.id, [])}
+            for constituency in Constituency.query.order_by(Constituency.name)
+        ]
+    })
+    response.headers['Cache-Control'] = 'public, max-age=300'
+    return response
+
+@app.route('/cycles', methods=['GET'])
+def get_cycles():
+    live = db.session.query(Applicant.cycle, func.count(Applicant.id)).group_by(Applicant.cycle).all()
+    return jsonify({
+        "active": app.config['BURSARY_CYCLE'],
+        "live": {str(cycle): count for cycle, count in live},
+        "archived": cycle_archive.cycles()
+    }), 200
+
+# CLI Commands
+def clear_cache_after_command():
+    cache.clear()
+    if not cache.shared:
+        # The in-memory cache belongs to this CLI process, not to the running server
+        click.echo('Cache cleared for this process only; without CACHE_URL the server keeps its own cache. '
+                   'POST /admin/cache/clear or restart the server to drop stale entries.')
+
+@app.cli.command('archive-cycle')
+@click.argument('cycle', type=int)
+def archive_cycle_command(cycle):
+    """Move a closed bursary cycle out of the live tables."""
+    if cycle == app.config['BURSARY_CYCLE']:
+        raise click.ClickException(f'{cycle} is the active cycle (BURSARY_CYCLE)')
+    backfill_typed_columns()
+    backfill_cycles()
+    backfill_lookups()
+    # Eligibility results are derived data and are not archived
+    applicant_ids = select(Applicant.id).where(Applicant.cycle == cycle)
+    EligibilityResult.query.filter(EligibilityResult.applicant_id.in_(applicant_ids)).delete(synchronize_session=False)
+    db.session.commit()
+    archived_ids = db.session.scalars(applicant_ids).all()
+
+    started = time.perf_counter()
+    counts = cycle_archive.archive(db.engine, cycle)
+    # Archived applicants leave the live list, so syncing clients must drop them too
+    record_tombstones(archived_ids)
+    db.session.commit()
+    clear_cache_after_command()
+    for table, count in counts.items():
+        click.echo(f'{table}: {count} rows archived')
+    click.echo(f'Cycle {cycle} archived to {cycle_archive.path(cycle)} in {time.perf_counter() - started:.1f}s')
+
+@app.cli.command('normalize-lookups')
+def normalize_lookups_command():
+    """Link every applicant to the institution, constituency and ward tables."""
+    started = time.perf_counter()
+    combinations = backfill_lookups(renormalize=True)
+    counts = {
+        model.__tablename__: db.session.scalar(select(func.count(model.id)))
+        for model in (Institution, Constituency, Ward)
+    }
+    clear_cache_after_command()
+    click.echo(f'{combinations} name combinations normalized into '
+               + ', '.join(f'{count} {table}' for table, count in counts.items())
+               + f' in {time.perf_counter() - started:.1f}s')
+
+@app.cli.command('migrate-typed-columns')
+def migrate_typed_columns_command():
+    """Parse dates of birth and normalize status values."""
+    started = time.perf_counter()
+    parsed, unparsed, reset = backfill_typed_columns()
+    clear_cache_after_command()
+    click.echo(f'{parsed} dates of birth parsed, {unparsed} left unparsed, '
+               f'{reset} unknown statuses reset to pending in {time.perf_counter() - started:.1f}s')
+
+@app.cli.command('set-role')
+@click.argument('email')
+@click.argument('role', type=click.Choice(['applicant', ADMIN_ROLE]))
+def set_role_command(email, role):
+    """Grant or remove administrator access (applies from the user's next login or refresh)."""
+    user = User.query.filter_by(email=email).first()
+    if user is None:
+        raise click.ClickException(f'No user with email {email}')
+    user.role = role
+    db.session.commit()
+    click.echo(f'{email} is now {role}')
+
+@app.cli.command('backup')
+def backup_command():
+    """Snapshot the database and uploads into BACKUP_FOLDER."""
+    report = backups.snapshot()
+    click.echo(f"Snapshot {report['snapshot']} in {report['duration_seconds']:.1f}s: "
+               f"database {report.get('database_bytes', 0)} bytes, "
+               f"{report['uploads_files']} uploads ({report['uploads_bytes']} bytes), "
+               f"{report['uploads_new_files']} new ({report['uploads_new_bytes']} bytes copied)")
+
+@app.cli.command('link-users')
+def link_users_command():
+    """Link applicants and applications to registered users."""
+    started = time.perf_counter()
+    linked = link_users()
+    unlinked = sum(
+        db.session.scalar(select(func.count(model.id)).where(model.user_id.is_(None)))
+        for model in (Applicant, BursaryApplication)
+    )
+    click.echo(f'{linked} rows linked, {unlinked} without a matching user in {time.perf_counter() - started:.1f}s')
+
 # Error Handlers
 @app.errorhandler(404)
 def not_found(error):
@@ -587,13 +2490,4 @@ def server_error(error):
     return jsonify({
         "success": False,
         "message": "Internal server error"
-    }), 500
-
-# Main Function
-if __name__ == '__main__':
-    # Ensure database is created
-    with app.app_context():
-        db.create_all()
-
-    # Run the Flask app
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    }), 500
\ No newline at end of file
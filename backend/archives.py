@@ -0,0 +1,67 @@
+import os
+import zipfile
+from datetime import datetime
+
+
+CHUNK_SIZE = 64 * 1024
+
+# Formats that are already compressed gain nothing from deflate
+STORED_EXTENSIONS = {'jpg', 'jpeg', 'png', 'gif', 'pdf', 'zip'}
+
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes back to the generator.
+
+    It has no seek() or tell(), so zipfile writes each entry with a trailing
+    data descriptor instead of rewinding to patch the local header.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(entries):
+    """Yield a ZIP archive of (arcname, path) entries without buffering it.
+
+    Memory use is bounded by CHUNK_SIZE regardless of how many files are
+    bundled. Files that no longer exist on disk are skipped.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, mode='w', allowZip64=True) as archive:
+        for arcname, path in entries:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            extension = path.rsplit('.', 1)[-1].lower()
+            info = zipfile.ZipInfo(arcname, datetime.fromtimestamp(stat.st_mtime).timetuple()[:6])
+            info.file_size = stat.st_size
+            info.compress_type = zipfile.ZIP_STORED if extension in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+            with open(path, 'rb') as source, archive.open(info, mode='w', force_zip64=stat.st_size > 0x7FFFFFFF) as target:
+                while True:
+                    chunk = source.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    target.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            data = sink.drain()
+            if data:
+                yield data
+    # Closing the archive writes the central directory
+    data = sink.drain()
+    if data:
+        yield data
@@ -0,0 +1,23 @@
+from functools import wraps
+
+from flask import jsonify
+from flask_jwt_extended import get_jwt, verify_jwt_in_request
+
+
+ADMIN_ROLE = 'admin'
+
+
+def admin_required(view):
+    """Like jwt_required(), but the access token must also carry role=admin.
+
+    The role is a claim set when the token is issued, so the check costs no
+    query; a role change applies from the user's next login or refresh.
+    Missing or invalid tokens get 401 from flask-jwt-extended, other users 403.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        verify_jwt_in_request()
+        if get_jwt().get('role') != ADMIN_ROLE:
+            return jsonify({"success": False, "message": "Administrator access required"}), 403
+        return view(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,323 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; schedulers there are not coordinated between processes
+    fcntl = None
+
+
+_SNAPSHOT = re.compile(r'\d{8}T\d{6}Z')
+_STAMP = '%Y%m%dT%H%M%SZ'
+
+
+class _Restarted(Exception):
+    pass
+
+
+def backup_sqlite(source, target, pages=256, pause=0.005, max_restarts=3):
+    """Copy a live SQLite database with the online backup API.
+
+    pages are copied per step, with a pause between steps. In WAL mode a read
+    transaction is held on the source for the whole copy: the backup then
+    reads one consistent snapshot and writers are never blocked. Otherwise
+    the source is read-locked only during a step, but a commit from another
+    connection restarts the copy, so after max_restarts the rest is copied
+    in one step, which blocks writers for the whole copy. The app always
+    runs its database in WAL mode; the fallback is for other files. The copy is written next to target and renamed into place
+    when complete. Returns the size of the copy in bytes.
+    """
+    partial = target + '.partial'
+    source_conn = sqlite3.connect(f'file:{source}?mode=ro', uri=True, isolation_level=None)
+    target_conn = sqlite3.connect(partial)
+    try:
+        if source_conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal':
+            source_conn.execute('BEGIN')
+            source_conn.execute('SELECT count(*) FROM sqlite_master').fetchone()
+        restarts = 0
+        last_remaining = None
+
+        def progress(status, remaining, total):
+            nonlocal restarts, last_remaining
+            if last_remaining is not None and remaining > last_remaining:
+                restarts += 1
+                if restarts > max_restarts:
+                    raise _Restarted()
+            last_remaining = remaining
+            time.sleep(pause)
+
+        try:
+            source_conn.backup(target_conn, pages=pages, progress=progress)
+        except _Restarted:
+            source_conn.backup(target_conn)
+    finally:
+        target_conn.close()
+        source_conn.close()
+    os.replace(partial, target)
+    return os.path.getsize(target)
+
+
+def hash_file(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BackupStore:
+    """Timestamped snapshots of the database and the uploads directory.
+
+    Each snapshot directory holds database.db, uploads.json (relative path ->
+    sha256, size, mtime) and report.json. Upload contents live once in
+    objects/<2 hex>/<sha256>, so a snapshot only copies files whose content
+    is new, and files whose size and mtime match the previous manifest are
+    not even re-read.
+    """
+
+    def __init__(self, directory, keep=14):
+        self.directory = directory
+        self.keep = keep
+
+    def snapshots(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name for name in os.listdir(self.directory) if _SNAPSHOT.fullmatch(name))
+
+    def report(self, name):
+        with open(os.path.join(self.directory, name, 'report.json')) as handle:
+            return json.load(handle)
+
+    def reports(self):
+        reports = []
+        for name in self.snapshots():
+            try:
+                reports.append(self.report(name))
+            except (OSError, ValueError):
+                continue  # still being written, or interrupted
+        return reports
+
+    def latest_time(self):
+        names = self.snapshots()
+        if not names:
+            return None
+        return datetime.strptime(names[-1], _STAMP).replace(tzinfo=timezone.utc).timestamp()
+
+    def _object_path(self, digest):
+        return os.path.join(self.directory, 'objects', digest[:2], digest)
+
+    def _manifest(self, name):
+        try:
+            with open(os.path.join(self.directory, name, 'uploads.json')) as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return {}
+
+    def snapshot(self, database=None, uploads=None, pages=256, pause=0.005):
+        started = time.perf_counter()
+        now = datetime.now(timezone.utc)
+        name = now.strftime(_STAMP)
+        previous = self.snapshots()
+        if previous and previous[-1] >= name:
+            raise RuntimeError(f'Snapshot {previous[-1]} is not older than {name}')
+        folder = os.path.join(self.directory, name)
+        os.makedirs(folder)
+
+        report = {'snapshot': name, 'started_at': now.isoformat()}
+        try:
+            if database:
+                database_started = time.perf_counter()
+                report['database_bytes'] = backup_sqlite(database, os.path.join(folder, 'database.db'), pages, pause)
+                report['database_seconds'] = round(time.perf_counter() - database_started, 3)
+            report.update(self._snapshot_uploads(uploads, folder, self._manifest(previous[-1]) if previous else {}))
+            report['stored_bytes'] = report.get('database_bytes', 0) + report['uploads_new_bytes']
+            report['duration_seconds'] = round(time.perf_counter() - started, 3)
+
+            with open(os.path.join(folder, 'report.json'), 'w') as handle:
+                json.dump(report, handle, indent=2)
+        except BaseException:
+            shutil.rmtree(folder, ignore_errors=True)
+            raise
+        self.prune()
+        return report
+
+    def _snapshot_uploads(self, uploads, folder, previous):
+        manifest = {}
+        new_files = new_bytes = total_bytes = 0
+        if uploads and os.path.isdir(uploads):
+            for root, _, files in os.walk(uploads):
+                for filename in files:
+                    if filename.endswith('.tmp'):
+                        continue  # documents being normalized
+                    path = os.path.join(root, filename)
+                    relative = os.path.relpath(path, uploads).replace(os.sep, '/')
+                    try:
+                        stat = os.stat(path)
+                        known = previous.get(relative)
+                        if known and known['size'] == stat.st_size and known['mtime_ns'] == stat.st_mtime_ns:
+                            digest = known['sha256']
+                        else:
+                            digest = hash_file(path)
+                        target = self._object_path(digest)
+                        if not os.path.exists(target):
+                            os.makedirs(os.path.dirname(target), exist_ok=True)
+                            shutil.copyfile(path, target + '.partial')
+                            os.replace(target + '.partial', target)
+                            new_files += 1
+                            new_bytes += stat.st_size
+                    except FileNotFoundError:
+                        continue  # deleted while we were walking
+                    manifest[relative] = {'sha256': digest, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+                    total_bytes += stat.st_size
+
+        with open(os.path.join(folder, 'uploads.json'), 'w') as handle:
+            json.dump(manifest, handle, sort_keys=True)
+        return {
+            'uploads_files': len(manifest),
+            'uploads_bytes': total_bytes,
+            'uploads_new_files': new_files,
+            'uploads_new_bytes': new_bytes,
+        }
+
+    def prune(self):
+        """Drop snapshots beyond keep and the upload objects no snapshot refers to."""
+        names = self.snapshots()
+        for name in names[:-self.keep] if self.keep > 0 else []:
+            shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+        referenced = set()
+        for name in self.snapshots():
+            referenced.update(entry['sha256'] for entry in self._manifest(name).values())
+        objects = os.path.join(self.directory, 'objects')
+        if not os.path.isdir(objects):
+            return
+        for prefix in os.listdir(objects):
+            for digest in os.listdir(os.path.join(objects, prefix)):
+                if digest not in referenced:
+                    os.remove(os.path.join(objects, prefix, digest))
+
+    def restore_uploads(self, name, uploads):
+        # Rebuild an uploads directory from a snapshot's manifest
+        for relative, entry in self._manifest(name).items():
+            path = os.path.join(uploads, *relative.split('/'))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            shutil.copyfile(self._object_path(entry['sha256']), path)
+
+
+class Backups:
+    """Scheduled online backups of the SQLite database and uploads.
+
+    With BACKUP_INTERVAL_MINUTES set, each process runs a daemon thread that
+    takes a snapshot once the newest one is older than the interval. A lock
+    file in BACKUP_FOLDER makes sure only one process snapshots at a time,
+    and the others see the fresh snapshot and wait for the next interval.
+    """
+
+    def __init__(self, app=None, db=None, metrics=None):
+        self.store = None
+        self.last_report = None
+        self._db = db
+        self._metrics = metrics
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db=None):
+        app.config.setdefault('BACKUP_FOLDER', os.path.join(app.root_path, 'backups'))
+        app.config.setdefault('BACKUP_INTERVAL_MINUTES', 0)
+        app.config.setdefault('BACKUP_KEEP', 14)
+        app.config.setdefault('BACKUP_PAGES_PER_STEP', 256)
+        app.config.setdefault('BACKUP_STEP_PAUSE', 0.005)
+        app.extensions['backups'] = self
+        self._app = app
+        self._db = db or self._db
+        self.store = BackupStore(app.config['BACKUP_FOLDER'], app.config['BACKUP_KEEP'])
+
+        if self._metrics is not None:
+            self._metrics.gauge(
+                'backup_last_duration_seconds', 'How long the last snapshot took.',
+                function=lambda: {(): self.last_report['duration_seconds']} if self.last_report else {})
+            self._metrics.gauge(
+                'backup_last_size_bytes', 'Size of the last snapshot.', ('part',),
+                function=lambda: {
+                    ('database',): self.last_report.get('database_bytes', 0),
+                    ('uploads',): self.last_report['uploads_bytes'],
+                    ('stored',): self.last_report['stored_bytes'],
+                } if self.last_report else {})
+            self._failures = self._metrics.counter('backup_failures_total', 'Snapshots that failed.')
+
+        if app.config['BACKUP_INTERVAL_MINUTES'] > 0:
+            self._thread = threading.Thread(target=self._run, name='backup-scheduler', daemon=True)
+            self._thread.start()
+
+    def database_path(self):
+        with self._app.app_context():
+            url = self._db.engine.url
+        if url.get_backend_name() != 'sqlite' or url.database in (None, '', ':memory:'):
+            return None
+        return url.database
+
+    @contextmanager
+    def _locked(self, blocking=True):
+        # Yields False when blocking is off and another process holds the lock
+        with self._lock:
+            os.makedirs(self.store.directory, exist_ok=True)
+            with open(os.path.join(self.store.directory, '.lock'), 'w') as lock:
+                if fcntl is not None:
+                    try:
+                        fcntl.flock(lock, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+                    except BlockingIOError:
+                        yield False
+                        return
+                yield True
+
+    def snapshot(self):
+        """Take a snapshot now. Returns its report."""
+        with self._locked():
+            return self._take()
+
+    def _take(self):
+        config = self._app.config
+        report = self.store.snapshot(
+            self.database_path(), config['UPLOAD_FOLDER'],
+            config['BACKUP_PAGES_PER_STEP'], config['BACKUP_STEP_PAUSE']
+        )
+        self.last_report = report
+        self._app.logger.info('Backup snapshot finished', extra={'backup': report})
+        return report
+
+    def _due_in(self):
+        interval = self._app.config['BACKUP_INTERVAL_MINUTES'] * 60
+        latest = self.store.latest_time()
+        return 0 if latest is None else max(0, latest + interval - time.time())
+
+    def _run(self):
+        delay = self._due_in()
+        while not self._stop.wait(delay):
+            try:
+                self._snapshot_if_due()
+                # Checked again at least a minute later when another process held the lock
+                delay = max(self._due_in(), 60)
+            except Exception:
+                if self._metrics is not None:
+                    self._failures.inc()
+                self._app.logger.exception('Backup snapshot failed')
+                delay = self._app.config['BACKUP_INTERVAL_MINUTES'] * 60
+
+    def _snapshot_if_due(self):
+        with self._locked(blocking=False) as acquired:
+            # Whoever held the lock may have just taken the snapshot
+            if acquired and self._due_in() == 0:
+                self._take()
+
+    def stop(self):
+        self._stop.set()
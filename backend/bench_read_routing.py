@@ -0,0 +1,157 @@
+"""Mixed read/write benchmark for database read routing.
+
+Runs reader processes (GET /applicants/<id>) alongside writer processes
+(POST /apply) against a scratch SQLite database, once with read routing
+disabled and once with it enabled, and prints read latency percentiles.
+
+    python bench_read_routing.py [--seconds 10] [--readers 8] [--writers 2] [--write-rate 20]
+
+Every client is its own process with its own copy of the app, so the runs
+measure contention in the database rather than on one interpreter lock.
+The database is switched to WAL before either run and admission control is
+off, so the only difference between the runs is where reads are sent.
+Writers are paced to --write-rate submissions per second each, so both runs
+carry the same write load and the read percentiles are comparable.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def seed(args):
+    import app as bursary
+
+    with bursary.app.app_context():
+        bursary.upgrade_schema(bursary.db)
+        for i in range(args.rows):
+            bursary.db.session.add(bursary.Applicant(
+                full_name=f'Student {i}', admission=f'B{i}', gender='F', form='3',
+                dob='2008-01-01', national_id=str(i), phone_number='0700000000',
+                email=f's{i}@example.com', institution_type='Secondary',
+                institution_name='Bench School', constituency='Balambala', ward='Saka'
+            ))
+        bursary.db.session.commit()
+        # The journal mode is stored in the file, so both runs use WAL
+        bursary.db.session.execute(bursary.db.text('PRAGMA journal_mode=WAL'))
+
+
+def client(args):
+    import app as bursary
+
+    test_client = bursary.app.test_client()
+    # Tell the parent we are loaded, then start together with the others
+    print('ready', flush=True)
+    sys.stdin.readline()
+
+    samples = []
+    errors = 0
+    n = 0
+    interval = 1.0 / args.write_rate
+    deadline = time.perf_counter() + args.seconds
+    next_write = time.perf_counter()
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        if args.role == 'reader':
+            response = test_client.get(f'/applicants/{random.randint(1, args.rows)}')
+        else:
+            n += 1
+            next_write += interval
+            response = test_client.post('/apply', data={
+                'fullName': 'Writer', 'admission': f'W{os.getpid()}-{n}', 'gender': 'M',
+                'form': '2', 'dob': '2009-05-05', 'nationalID': '1', 'phoneNumber': '0700000000',
+                'email': 'w@example.com', 'institutionType': 'Secondary', 'institutionName': 'Bench School',
+                'constituency': 'Balambala', 'ward': 'Saka'
+            })
+        samples.append(time.perf_counter() - started)
+        errors += response.status_code >= 400
+        if args.role == 'writer':
+            time.sleep(max(0.0, next_write - time.perf_counter()))
+    print(json.dumps({'samples': samples, 'errors': errors}), flush=True)
+
+
+def run(args, routing):
+    with tempfile.TemporaryDirectory() as scratch:
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{os.path.join(scratch, 'bench.db')}",
+            LOG_FILE=os.path.join(scratch, 'bench.log'),
+            DB_READ_ROUTING=routing,
+            ADMISSION_CONTROL_ENABLED='false',
+            DOCUMENT_WORKERS='0',
+        )
+        command = [sys.executable, os.path.abspath(__file__)] + sys.argv[1:]
+        cwd = os.path.dirname(os.path.abspath(__file__))
+        subprocess.run(command + ['--role', 'seed'], env=env, cwd=cwd, check=True, stdout=subprocess.DEVNULL)
+
+        roles = ['reader'] * args.readers + ['writer'] * args.writers
+        processes = [
+            subprocess.Popen(command + ['--role', role], env=env, cwd=cwd, text=True,
+                             stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+            for role in roles
+        ]
+        for process in processes:
+            process.stdout.readline()
+        for process in processes:
+            process.stdin.write('go\n')
+            process.stdin.flush()
+
+        latencies = {'reader': [], 'writer': []}
+        errors = 0
+        for role, process in zip(roles, processes):
+            output, _ = process.communicate()
+            result = json.loads(output.strip().splitlines()[-1])
+            latencies[role].extend(result['samples'])
+            errors += result['errors']
+
+    reads, writes = latencies['reader'], latencies['writer']
+    return {
+        'reads': len(reads),
+        'writes': len(writes),
+        'errors': errors,
+        'read_p50_ms': percentile(reads, 0.50) * 1000,
+        'read_p95_ms': percentile(reads, 0.95) * 1000,
+        'read_p99_ms': percentile(reads, 0.99) * 1000,
+        'read_max_ms': max(reads, default=0) * 1000,
+        'write_p50_ms': percentile(writes, 0.50) * 1000,
+        'write_p99_ms': percentile(writes, 0.99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--write-rate', type=float, default=20)
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--role', choices=('seed', 'reader', 'writer'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.role == 'seed':
+        seed(args)
+        return
+    if args.role:
+        client(args)
+        return
+
+    results = {routing: run(args, routing) for routing in ('false', 'true')}
+
+    print(f"{'':24}{'single engine':>16}{'read routing':>16}")
+    for key in results['false']:
+        print(f'{key:24}{results["false"][key]:>16.1f}{results["true"][key]:>16.1f}')
+
+
+if __name__ == '__main__':
+    main()
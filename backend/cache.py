@@ -0,0 +1,230 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import redis
+except ImportError:  # redis is only needed for the shared backend
+    redis = None
+
+
+# Stored in place of an invalidated entry; see Cache.invalidate
+TOMBSTONE = {'__cache_tombstone__': 1}
+
+
+class MemoryBackend:
+    """LRU cache with a TTL, private to this process."""
+
+    shared = False
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def add(self, key, value):
+        # Like set, but only when there is no live entry for key
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._store(key, value, None)
+
+    def _store(self, key, value, ttl):
+        self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteBackend:
+    """Cache shared by the worker processes on one host through a SQLite file.
+
+    Values are stored as JSON. Expired rows are ignored on read and removed
+    when the key is written again or the cache is pruned.
+    """
+
+    shared = True
+
+    def __init__(self, path, ttl=300):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connection() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)')
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._connection().execute(
+            'SELECT value FROM cache WHERE key = ? AND expires >= ?', (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, value, ttl=None):
+        self._connection().execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)',
+            (key, json.dumps(value), time.time() + (self.ttl if ttl is None else ttl))
+        )
+
+    def add(self, key, value):
+        now = time.time()
+        self._connection().execute(
+            'INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires = excluded.expires '
+            'WHERE cache.expires < ?',
+            (key, json.dumps(value), now + self.ttl, now)
+        )
+
+    def delete(self, *keys):
+        self._connection().executemany('DELETE FROM cache WHERE key = ?', [(key,) for key in keys])
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache')
+
+    def prune(self):
+        self._connection().execute('DELETE FROM cache WHERE expires < ?', (time.time(),))
+
+
+class RedisBackend:
+    """Cache shared by every worker through Redis (or anything speaking its protocol)."""
+
+    shared = True
+
+    def __init__(self, url, ttl=300, prefix='bursary-cache:'):
+        if redis is None:
+            raise RuntimeError('The redis package is required for a redis:// CACHE_URL')
+        self._client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self._client.get(self.prefix + key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key, value, ttl=None):
+        self._client.set(self.prefix + key, json.dumps(value), px=int((self.ttl if ttl is None else ttl) * 1000))
+
+    def add(self, key, value):
+        self._client.set(self.prefix + key, json.dumps(value), ex=self.ttl, nx=True)
+
+    def delete(self, *keys):
+        if keys:
+            self._client.delete(*(self.prefix + key for key in keys))
+
+    def clear(self):
+        for key in self._client.scan_iter(self.prefix + '*'):
+            self._client.delete(key)
+
+
+class Cache:
+    """Read-through cache of plain (JSON-serializable) values.
+
+    Keys are grouped into namespaces ("applicant", "user", ...) so hits and
+    misses can be reported per kind of record. A loader returning None is
+    not cached, so missing records are always looked up again.
+
+    Invalidating a key leaves a tombstone for tombstone_ttl seconds rather
+    than deleting it, and loaded values are only stored where no entry
+    exists. A reader that loaded the old row just before a write committed,
+    or read it from a lagging replica, therefore cannot put it back; the
+    tombstone has to outlive both, so keep it at least as long as
+    DB_READ_AFTER_WRITE_SECONDS.
+    """
+
+    def __init__(self, backend, metrics=None, tombstone_ttl=5):
+        self.backend = backend
+        self.tombstone_ttl = tombstone_ttl
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._requests = None
+        if metrics is not None:
+            self._requests = metrics.counter(
+                'cache_requests_total', 'Read-through cache lookups.', ('namespace', 'result'))
+            metrics.gauge('cache_hit_ratio', 'Fraction of cache lookups served from the cache.',
+                          ('namespace',), function=self.hit_ratios)
+
+    @staticmethod
+    def key(namespace, key):
+        return f'{namespace}:{key}'
+
+    @property
+    def shared(self):
+        return self.backend.shared
+
+    def get_or_load(self, namespace, key, loader):
+        value = self.backend.get(self.key(namespace, key))
+        invalidated = value == TOMBSTONE
+        self._record(namespace, value is not None and not invalidated)
+        if value is None or invalidated:
+            value = loader()
+            if value is not None and not invalidated:
+                self.backend.add(self.key(namespace, key), value)
+        return value
+
+    def invalidate(self, namespace, *keys):
+        for key in keys:
+            if key is not None:
+                self.backend.set(self.key(namespace, key), TOMBSTONE, self.tombstone_ttl)
+
+    def clear(self):
+        self.backend.clear()
+
+    def _record(self, namespace, hit):
+        with self._lock:
+            hits, misses = self._stats.get(namespace, (0, 0))
+            self._stats[namespace] = (hits + 1, misses) if hit else (hits, misses + 1)
+        if self._requests is not None:
+            self._requests.inc(namespace=namespace, result='hit' if hit else 'miss')
+
+    def hit_ratios(self):
+        with self._lock:
+            return {
+                (namespace,): hits / (hits + misses)
+                for namespace, (hits, misses) in self._stats.items()
+                if hits + misses
+            }
+
+
+def create_cache(url=None, maxsize=1024, ttl=300, metrics=None, tombstone_ttl=5):
+    if url and url.startswith('redis://'):
+        return Cache(RedisBackend(url, ttl), metrics, tombstone_ttl)
+    if url and url.startswith('sqlite:///'):
+        return Cache(SQLiteBackend(url[len('sqlite:///'):], ttl), metrics, tombstone_ttl)
+    return Cache(MemoryBackend(maxsize, ttl), metrics, tombstone_ttl)
@@ -0,0 +1,168 @@
+import zlib
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+
+DEFAULT_MIMETYPES = {
+    'application/json',
+    'application/javascript',
+    'text/html',
+    'text/css',
+    'text/csv',
+    'text/plain',
+    'text/xml',
+    'text/event-stream',
+}
+
+
+def parse_accept_encoding(header):
+    """Return a dict of coding -> q-value from an Accept-Encoding header."""
+    codings = {}
+    for part in (header or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        coding, _, params = part.partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        codings[coding.strip().lower()] = q
+    return codings
+
+
+class _GzipStream:
+    def __init__(self, level):
+        # wbits=31 gives a gzip container instead of a raw zlib stream
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._obj.compress(data)
+
+    def flush(self):
+        return self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._obj.flush(zlib.Z_FINISH)
+
+
+class _BrotliStream:
+    def __init__(self, quality):
+        self._obj = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._obj.process(data)
+
+    def flush(self):
+        return self._obj.flush()
+
+    def finish(self):
+        return self._obj.finish()
+
+
+class Compress:
+    """Negotiated gzip/brotli compression for outgoing responses.
+
+    Buffered responses are compressed in one shot when they are larger than
+    COMPRESS_MIN_SIZE. Streamed (generator) responses are compressed chunk by
+    chunk and flushed after every chunk so clients still see data as it is
+    produced.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('COMPRESS_ENABLED', True)
+        app.config.setdefault('COMPRESS_MIN_SIZE', 1024)
+        app.config.setdefault('COMPRESS_LEVEL', 6)
+        app.config.setdefault('COMPRESS_BR_LEVEL', 4)
+        app.config.setdefault('COMPRESS_MIMETYPES', DEFAULT_MIMETYPES)
+        app.config.setdefault('COMPRESS_STREAMS', True)
+        app.after_request(self.after_request)
+        app.extensions['compress'] = self
+        self.app = app
+
+    def choose_encoding(self, accept_encoding):
+        codings = parse_accept_encoding(accept_encoding)
+        wildcard = codings.get('*', 0.0)
+        candidates = []
+        if brotli is not None:
+            candidates.append(('br', codings.get('br', wildcard)))
+        candidates.append(('gzip', codings.get('gzip', wildcard)))
+        # Prefer brotli on ties since it compresses JSON noticeably better
+        best, best_q = None, 0.0
+        for coding, q in candidates:
+            if q > best_q:
+                best, best_q = coding, q
+        return best
+
+    def _compressor(self, encoding):
+        if encoding == 'br':
+            return _BrotliStream(self.app.config['COMPRESS_BR_LEVEL'])
+        return _GzipStream(self.app.config['COMPRESS_LEVEL'])
+
+    def after_request(self, response):
+        from flask import request
+
+        config = self.app.config
+        if not config['COMPRESS_ENABLED']:
+            return response
+
+        vary = response.vary
+        if response.mimetype in config['COMPRESS_MIMETYPES']:
+            vary.add('Accept-Encoding')
+
+        if (
+            request.method == 'HEAD'
+            or response.status_code < 200
+            or response.status_code in (204, 206, 304)
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in config['COMPRESS_MIMETYPES']
+            or response.direct_passthrough
+        ):
+            return response
+
+        encoding = self.choose_encoding(request.headers.get('Accept-Encoding'))
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            if not config['COMPRESS_STREAMS']:
+                return response
+            response.response = self._stream(response.response, encoding)
+            response.headers.pop('Content-Length', None)
+        else:
+            body = response.get_data()
+            if len(body) < config['COMPRESS_MIN_SIZE']:
+                return response
+            compressor = self._compressor(encoding)
+            response.set_data(compressor.compress(body) + compressor.finish())
+
+        response.headers['Content-Encoding'] = encoding
+        # The compressed representation is not byte-identical to the original
+        if response.headers.get('ETag') and not response.headers['ETag'].startswith('W/'):
+            response.headers['ETag'] = 'W/' + response.headers['ETag']
+        return response
+
+    def _stream(self, iterable, encoding):
+        compressor = self._compressor(encoding)
+        try:
+            for chunk in iterable:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode('utf-8')
+                data = compressor.compress(chunk) + compressor.flush()
+                if data:
+                    yield data
+            yield compressor.finish()
+        finally:
+            close = getattr(iterable, 'close', None)
+            if close is not None:
+                close()
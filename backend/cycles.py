@@ -0,0 +1,95 @@
+import os
+import re
+
+from flask import g
+from sqlalchemy import create_engine, delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from migrations import upgrade_tables
+
+
+_FILENAME = re.compile(r'cycle_(\d{4})\.db')
+
+
+class CycleArchive:
+    """Closed bursary cycles moved out of the live tables, one SQLite file per cycle.
+
+    Archived rows keep their table names, columns and ids, so the same
+    queries run against session(cycle) as against the live database.
+    """
+
+    def __init__(self, directory, tables, app=None):
+        self.directory = directory
+        self.tables = tables
+        self._engines = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.teardown_appcontext(self._close_sessions)
+
+    def path(self, cycle):
+        return os.path.join(self.directory, f'cycle_{int(cycle)}.db')
+
+    def has(self, cycle):
+        return os.path.isfile(self.path(cycle))
+
+    def cycles(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            int(match.group(1))
+            for match in map(_FILENAME.fullmatch, os.listdir(self.directory))
+            if match
+        )
+
+    def engine(self, cycle):
+        cycle = int(cycle)
+        if cycle not in self._engines:
+            engine = create_engine(f'sqlite:///{self.path(cycle)}')
+            if os.path.isfile(self.path(cycle)):
+                # Archives written before a column was added still have to answer the same queries
+                upgrade_tables(engine, self.tables)
+            self._engines[cycle] = engine
+        return self._engines[cycle]
+
+    def session(self, cycle):
+        # One session per archived cycle per app context, closed on teardown
+        sessions = g.setdefault('_archive_sessions', {})
+        if cycle not in sessions:
+            sessions[cycle] = Session(self.engine(cycle))
+        return sessions[cycle]
+
+    def _close_sessions(self, exc):
+        for session in g.pop('_archive_sessions', {}).values():
+            session.close()
+
+    def archive(self, engine, cycle, batch=1000):
+        """Move every row of cycle from engine into its archive file.
+
+        Rows are deleted with RETURNING and the returned rows are what gets
+        copied, so a row changed or added while the archive runs cannot be
+        deleted without being copied. The archive is committed and counted
+        before the delete is, and rows are upserted by primary key, so an
+        interrupted run can be repeated. Returns the number of rows moved
+        per table.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        target = self.engine(cycle)
+        self.tables[0].metadata.create_all(target, tables=self.tables)
+
+        counts = {}
+        with engine.begin() as source:
+            with target.begin() as dest:
+                for table in self.tables:
+                    result = source.execute(delete(table).where(table.c.cycle == cycle).returning(*table.c))
+                    counts[table.name] = 0
+                    for rows in result.partitions(batch):
+                        dest.execute(insert(table).prefix_with('OR REPLACE'), [dict(row._mapping) for row in rows])
+                        counts[table.name] += len(rows)
+                    archived = dest.execute(
+                        select(func.count()).select_from(table).where(table.c.cycle == cycle)
+                    ).scalar()
+                    if archived < counts[table.name]:
+                        raise RuntimeError(f'{table.name}: only {archived} of {counts[table.name]} rows reached the archive')
+        return counts
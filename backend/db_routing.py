@@ -0,0 +1,93 @@
+import sqlite3
+import time
+
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.orm import Session as BaseSession
+
+
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+STICKY_COOKIE = 'db_primary_until'
+
+
+class RoutingSession(Session):
+    """Session that sends read-only requests to a separate read engine.
+
+    A request is routed to the reader only when it uses a safe method, has
+    not written anything yet and the client did not write within the last
+    DB_READ_AFTER_WRITE_SECONDS (tracked with a short-lived cookie, so a user
+    always reads back their own writes even from a lagging replica).
+    Everything else, including work done outside a request, uses the
+    primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._use_reader():
+            reader = current_app.extensions.get('read_engine')
+            if reader is not None:
+                return reader
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _use_reader(self):
+        if not has_request_context() or request.method not in READ_METHODS:
+            return False
+        if g.get('_db_wrote') or self._flushing or self.new or self.dirty or self.deleted:
+            return False
+        sticky_until = request.cookies.get(STICKY_COOKIE, '')
+        return not (sticky_until.isdigit() and int(sticky_until) > time.time())
+
+
+def _sqlite_wal(dbapi_connection, connection_record):
+    # WAL lets readers keep reading while a writer commits
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.close()
+
+
+def create_read_engine(primary, url=None, pool_size=10):
+    """Build the read engine: a replica URL, or read-only connections to the SQLite file."""
+    if url:
+        return create_engine(url, pool_size=pool_size, pool_pre_ping=True)
+    if primary.url.get_backend_name() != 'sqlite' or primary.url.database in (None, '', ':memory:'):
+        return None
+    path = primary.url.database
+
+    def connect():
+        return sqlite3.connect(f'file:{path}?mode=ro', uri=True, check_same_thread=False)
+
+    return create_engine('sqlite://', creator=connect, poolclass=QueuePool,
+                         pool_size=pool_size, max_overflow=pool_size)
+
+
+def init_read_routing(app, db):
+    app.config.setdefault('DB_READ_ROUTING', False)
+    app.config.setdefault('DATABASE_READ_URL', None)
+    app.config.setdefault('DB_READ_POOL_SIZE', 10)
+    app.config.setdefault('DB_READ_AFTER_WRITE_SECONDS', 5)
+
+    with app.app_context():
+        primary = db.engine
+        # WAL whether or not reads are routed: online backups and readers never wait on a commit
+        if primary.url.get_backend_name() == 'sqlite':
+            event.listen(primary, 'connect', _sqlite_wal)
+        if not app.config['DB_READ_ROUTING']:
+            return
+        app.extensions['read_engine'] = create_read_engine(
+            primary, app.config['DATABASE_READ_URL'], app.config['DB_READ_POOL_SIZE'])
+
+    @event.listens_for(BaseSession, 'after_flush')
+    def remember_write(session, flush_context):
+        if has_request_context():
+            g._db_wrote = True
+
+    @app.after_request
+    def stick_to_primary(response):
+        if g.get('_db_wrote'):
+            window = app.config['DB_READ_AFTER_WRITE_SECONDS']
+            response.set_cookie(STICKY_COOKIE, str(int(time.time()) + window),
+                                max_age=window, httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,207 @@
+import multiprocessing
+import os
+import re
+import struct
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional; without it images are checked but not re-encoded
+    Image = None
+
+
+SIGNATURES = (
+    (b'\xff\xd8\xff', 'jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+    (b'%PDF-', 'pdf'),
+)
+
+EXTENSIONS = {
+    'jpeg': {'jpg', 'jpeg'},
+    'png': {'png'},
+    'gif': {'gif'},
+    'pdf': {'pdf'},
+}
+
+_PDF_PAGE = re.compile(rb'/Type\s{0,32}/Page(?![a-zA-Z])')
+_PDF_PAGE_OVERLAP = 64  # longer than any match of _PDF_PAGE plus its lookahead
+
+
+def detect_type(header):
+    for signature, kind in SIGNATURES:
+        if header.startswith(signature):
+            return kind
+    return None
+
+
+def image_dimensions(path, kind):
+    """Read width and height from the image header without decoding pixels."""
+    with open(path, 'rb') as handle:
+        if kind == 'png':
+            handle.seek(16)
+            return struct.unpack('>II', handle.read(8))
+        if kind == 'gif':
+            handle.seek(6)
+            return struct.unpack('<HH', handle.read(4))
+        # JPEG: walk the markers up to the first start-of-frame
+        handle.seek(2)
+        while True:
+            marker = handle.read(2)
+            if len(marker) < 2 or marker[0] != 0xFF:
+                return None
+            if marker[1] in (0xD8, 0x01) or 0xD0 <= marker[1] <= 0xD7:
+                continue
+            length = struct.unpack('>H', handle.read(2))[0]
+            if 0xC0 <= marker[1] <= 0xCF and marker[1] not in (0xC4, 0xC8, 0xCC):
+                height, width = struct.unpack('>xHH', handle.read(5))
+                return width, height
+            handle.seek(length - 2, os.SEEK_CUR)
+
+
+def pdf_page_count(path, chunk_size=1024 * 1024):
+    """Count page objects, reading the file a chunk at a time."""
+    count = 0
+    carry = b''
+    with open(path, 'rb') as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b''):
+            data = carry + chunk
+            # A match starting near the end may be cut off; it is counted with the next chunk
+            cut = max(0, len(data) - _PDF_PAGE_OVERLAP)
+            count += sum(1 for match in _PDF_PAGE.finditer(data) if match.start() < cut)
+            carry = data[cut:]
+    return count + len(_PDF_PAGE.findall(carry))
+
+
+def _pdf_is_complete(path):
+    with open(path, 'rb') as handle:
+        handle.seek(max(0, os.path.getsize(path) - 1024))
+        return b'%%EOF' in handle.read()
+
+
+def _normalize_image(path, kind, max_dimension, quality):
+    """Strip metadata and shrink oversized photos in place. Returns the new dimensions."""
+    with Image.open(path) as image:
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_dimension, max_dimension))
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        os.close(fd)
+        try:
+            if kind == 'jpeg':
+                image.convert('RGB').save(temp_path, 'JPEG', quality=quality, optimize=True)
+            else:
+                # Saving without passing exif/info drops the metadata
+                image.save(temp_path, kind.upper(), optimize=True)
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return image.size
+
+
+def validate_document(path, max_bytes=5 * 1024 * 1024, max_dimension=2000, max_pages=20, quality=85):
+    """Check an uploaded document and normalize it if it is an oversized photo.
+
+    Runs in a worker process, so it only takes and returns plain data.
+    """
+    report = {'valid': False, 'errors': [], 'normalized': False}
+    if not os.path.isfile(path):
+        report['errors'].append('File is missing')
+        return report
+
+    report['size'] = os.path.getsize(path)
+    with open(path, 'rb') as handle:
+        kind = detect_type(handle.read(16))
+    report['type'] = kind
+    if kind is None:
+        report['errors'].append('Unrecognized file contents')
+        return report
+
+    extension = path.rsplit('.', 1)[-1].lower()
+    if extension not in EXTENSIONS[kind]:
+        report['errors'].append(f'Extension .{extension} does not match {kind} contents')
+
+    if kind == 'pdf':
+        if not _pdf_is_complete(path):
+            report['errors'].append('PDF is truncated or corrupt')
+        pages = pdf_page_count(path)
+        report['pages'] = pages
+        if pages == 0:
+            report['errors'].append('PDF has no pages')
+        elif pages > max_pages:
+            report['errors'].append(f'PDF has {pages} pages (limit {max_pages})')
+        if report['size'] > max_bytes:
+            report['errors'].append('PDF is too large')
+    else:
+        try:
+            dimensions = image_dimensions(path, kind)
+        except struct.error:
+            dimensions = None
+        if Image is not None:
+            try:
+                with Image.open(path) as image:
+                    image.verify()
+                    dimensions = image.size
+                    has_metadata = bool(image.info.get('exif'))
+            except Exception:
+                dimensions = None
+                has_metadata = False
+        else:
+            has_metadata = False
+        if dimensions is None:
+            report['errors'].append('Image is truncated or corrupt')
+        else:
+            report['width'], report['height'] = dimensions
+            oversized = max(dimensions) > max_dimension or report['size'] > max_bytes
+            if Image is not None and not report['errors'] and (oversized or has_metadata):
+                report['width'], report['height'] = _normalize_image(path, kind, max_dimension, quality)
+                report['normalized'] = True
+                report['original_size'] = report['size']
+                report['size'] = os.path.getsize(path)
+            elif oversized:
+                report['errors'].append('Image is too large')
+
+    report['valid'] = not report['errors']
+    return report
+
+
+class DocumentQueue:
+    """Runs validate_document in a process pool and reports results back.
+
+    on_result(job, report) is called from the pool's result thread once a
+    document has been checked. With DOCUMENT_WORKERS=0 documents are checked
+    synchronously instead, which is only meant for development.
+    """
+
+    def __init__(self, on_result, workers=2, options=None):
+        self.on_result = on_result
+        self.workers = workers
+        self.options = options or {}
+        self._executor = None
+
+    def _pool(self):
+        if self._executor is None:
+            # spawn avoids forking a process that holds database connections and threads
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+        return self._executor
+
+    def submit(self, job, path):
+        if self.workers <= 0:
+            self.on_result(job, validate_document(path, **self.options))
+            return
+        future = self._pool().submit(validate_document, path, **self.options)
+
+        def done(future):
+            try:
+                report = future.result()
+            except Exception as e:
+                report = {'valid': False, 'errors': [f'Validation failed: {e}'], 'normalized': False}
+            self.on_result(job, report)
+
+        future.add_done_callback(done)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
@@ -0,0 +1,181 @@
+import json
+from datetime import date
+
+import numpy as np
+from sqlalchemy import Float, and_, case, cast, not_
+
+
+OPERATORS = ('eq', 'ne', 'in', 'not_in', 'lt', 'lte', 'gt', 'gte', 'between')
+NUMERIC_OPERATORS = ('lt', 'lte', 'gt', 'gte', 'between')
+
+# Fields derived in Python from another column rather than read directly
+DERIVED_FIELDS = {'age': 'dob'}
+
+
+class RuleError(ValueError):
+    pass
+
+
+def parse_value(operator, value, numeric=False):
+    """Check the shape of a rule value. Stored values go through decode_value first.
+
+    Range operators and numeric fields need numbers; everything else takes
+    strings or numbers.
+    """
+    if operator in ('in', 'not_in'):
+        if not isinstance(value, list):
+            raise RuleError(f'{operator} needs a list value')
+        items = value
+    elif operator == 'between':
+        if not (isinstance(value, list) and len(value) == 2):
+            raise RuleError('between needs a [low, high] value')
+        items = value
+    elif isinstance(value, (list, dict)):
+        raise RuleError(f'{operator} needs a single value')
+    else:
+        items = [value]
+    if numeric or operator in NUMERIC_OPERATORS:
+        if not all(_is_number(item) for item in items):
+            raise RuleError(f'{operator} needs numeric values')
+    elif not all(isinstance(item, str) or _is_number(item) for item in items):
+        raise RuleError(f'{operator} needs string or numeric values')
+    return value
+
+
+def decode_value(stored):
+    return json.loads(stored)
+
+
+def is_numeric_field(field, sql_fields):
+    if field in DERIVED_FIELDS:
+        return True
+    try:
+        return sql_fields[field].type.python_type in (int, float)
+    except NotImplementedError:
+        return False
+
+
+def validate_rule(field, operator, value, sql_fields):
+    if field not in sql_fields and field not in DERIVED_FIELDS:
+        raise RuleError(f'Unknown field: {field}')
+    if operator not in OPERATORS:
+        raise RuleError(f'Unknown operator: {operator}')
+    return parse_value(operator, value, is_numeric_field(field, sql_fields))
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def sql_predicate(column, operator, value):
+    """Compile one rule to a SQLAlchemy boolean expression."""
+    numeric = operator in NUMERIC_OPERATORS and all(
+        _is_number(v) for v in (value if isinstance(value, list) else [value]))
+    if numeric:
+        column = cast(column, Float)
+    if operator == 'eq':
+        return column == value
+    if operator == 'ne':
+        return column != value
+    if operator == 'in':
+        return column.in_(value)
+    if operator == 'not_in':
+        return not_(column.in_(value))
+    if operator == 'lt':
+        return column < value
+    if operator == 'lte':
+        return column <= value
+    if operator == 'gt':
+        return column > value
+    if operator == 'gte':
+        return column >= value
+    if operator == 'between':
+        return and_(column >= value[0], column <= value[1])
+    raise RuleError(f'Unknown operator: {operator}')
+
+
+def vector_predicate(values, operator, value):
+    """Compile one rule to a NumPy boolean array over values. NaN never passes."""
+    values = np.asarray(values, dtype=np.float64)
+    with np.errstate(invalid='ignore'):
+        if operator == 'eq':
+            return values == value
+        if operator == 'ne':
+            return ~np.isnan(values) & (values != value)
+        if operator == 'in':
+            return np.isin(values, value)
+        if operator == 'not_in':
+            return ~np.isnan(values) & ~np.isin(values, value)
+        if operator == 'lt':
+            return values < value
+        if operator == 'lte':
+            return values <= value
+        if operator == 'gt':
+            return values > value
+        if operator == 'gte':
+            return values >= value
+        if operator == 'between':
+            return (values >= value[0]) & (values <= value[1])
+    raise RuleError(f'Unknown operator: {operator}')
+
+
+def ages(dob_strings, today=None):
+    """Whole years between each YYYY-MM-DD date of birth and today (NaN if unparsable)."""
+    today = today or date.today()
+    parsed = np.array([_parse_date(value) for value in dob_strings], dtype='datetime64[D]')
+    valid = ~np.isnat(parsed)
+    years = parsed.astype('datetime64[Y]').astype(np.int64) + 1970
+    months = parsed.astype('datetime64[M]').astype(np.int64) % 12 + 1
+    days = (parsed - parsed.astype('datetime64[M]')).astype(np.int64) + 1
+    before_birthday = (months > today.month) | ((months == today.month) & (days > today.day))
+    result = (today.year - years - before_birthday).astype(np.float64)
+    result[~valid] = np.nan
+    return result
+
+
+def _parse_date(value):
+    if not value:
+        return 'NaT'
+    try:
+        return np.datetime64(str(value)[:10], 'D')
+    except ValueError:
+        return 'NaT'
+
+
+def evaluate(session, base_query, id_column, rules, sql_fields):
+    """Evaluate rules over every row of base_query in one pass.
+
+    SQL-compilable rules become CASE columns of a single SELECT; derived
+    rules (age) are evaluated on the fetched source column with NumPy.
+    Returns the row ids and an (n_rows, n_rules) boolean outcome matrix.
+    """
+    sql_rules = [(i, rule) for i, rule in enumerate(rules) if rule.field not in DERIVED_FIELDS]
+    derived_rules = [(i, rule) for i, rule in enumerate(rules) if rule.field in DERIVED_FIELDS]
+    derived_sources = sorted({DERIVED_FIELDS[rule.field] for _, rule in derived_rules})
+
+    columns = [id_column]
+    columns += [sql_fields[source] for source in derived_sources]
+    columns += [
+        case((sql_predicate(sql_fields[rule.field], rule.operator, parse_value(rule.operator, decode_value(rule.value))), 1), else_=0)
+        for _, rule in sql_rules
+    ]
+    rows = session.execute(base_query.with_only_columns(*columns)).all()
+
+    outcomes = np.zeros((len(rows), len(rules)), dtype=bool)
+    if not rows:
+        return np.zeros(0, dtype=np.int64), outcomes
+
+    table = list(zip(*rows))
+    ids = np.array(table[0], dtype=np.int64)
+    sources = {name: table[1 + k] for k, name in enumerate(derived_sources)}
+    offset = 1 + len(derived_sources)
+    for k, (i, _) in enumerate(sql_rules):
+        outcomes[:, i] = np.array(table[offset + k], dtype=bool)
+
+    derived_values = {}
+    for i, rule in derived_rules:
+        if rule.field not in derived_values:
+            derived_values[rule.field] = ages(sources[DERIVED_FIELDS[rule.field]])
+        outcomes[:, i] = vector_predicate(
+            derived_values[rule.field], rule.operator, parse_value(rule.operator, decode_value(rule.value), numeric=True))
+    return ids, outcomes
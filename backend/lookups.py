@@ -0,0 +1,87 @@
+import re
+import threading
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+
+_PUNCTUATION = re.compile(r'[^\w\s]')
+_SPACES = re.compile(r'\s+')
+
+
+def normalize_key(name):
+    """Matching key for a free-text name: "St. Mary's  Girls" -> "st marys girls"."""
+    return _SPACES.sub(' ', _PUNCTUATION.sub('', name or '')).strip().casefold()
+
+
+def display_name(name):
+    return _SPACES.sub(' ', name or '').strip()
+
+
+class LookupTable:
+    """In-memory index of a reference table (id, key, name) by normalized key.
+
+    Misses fall through to the database, and unknown names are inserted and
+    committed on their own, so the cache only ever holds committed ids and
+    every worker converges on the same row for the same key. parent_column
+    scopes keys, e.g. ward names are unique per constituency.
+    """
+
+    def __init__(self, model, parent_column=None):
+        self.model = model
+        self.parent_column = parent_column
+        self._by_key = {}
+        self._names = {}
+        self._lock = threading.Lock()
+
+    def _filters(self, key, parent_id):
+        filters = {'key': key}
+        if self.parent_column:
+            filters[self.parent_column] = parent_id
+        return filters
+
+    def _remember(self, row):
+        parent_id = getattr(row, self.parent_column) if self.parent_column else None
+        with self._lock:
+            self._by_key[(parent_id, row.key)] = (row.id, row.name)
+            self._names[row.id] = row.name
+        return row.id, row.name
+
+    def load(self, session):
+        for row in session.scalars(select(self.model)):
+            self._remember(row)
+
+    def find(self, session, name, parent_id=None):
+        """Return (id, canonical name) for name, or None if it is not known."""
+        key = normalize_key(name)
+        if not key:
+            return None
+        entry = self._by_key.get((parent_id, key))
+        if entry is None:
+            row = session.scalars(select(self.model).filter_by(**self._filters(key, parent_id))).first()
+            if row is not None:
+                entry = self._remember(row)
+        return entry
+
+    def resolve(self, session, name, parent_id=None, create=True):
+        entry = self.find(session, name, parent_id)
+        if entry is not None or not create or not normalize_key(name):
+            return entry
+        filters = self._filters(normalize_key(name), parent_id)
+        with Session(session.get_bind()) as writer:
+            writer.add(self.model(name=display_name(name), **filters))
+            try:
+                writer.commit()
+            except IntegrityError:
+                # Another worker inserted the same key first
+                writer.rollback()
+            return self._remember(writer.scalars(select(self.model).filter_by(**filters)).one())
+
+    def name(self, entry_id):
+        return self._names.get(entry_id)
+
+    def clear(self):
+        with self._lock:
+            self._by_key.clear()
+            self._names.clear()
@@ -0,0 +1,270 @@
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DEFAULT_SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+DEFAULT_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(labels.get(name, '') for name in self.labelnames)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        lines.extend(self._samples())
+        return lines
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+                for key, value in items]
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), function=None):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+        self._function = function
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def _samples(self):
+        if self._function is not None:
+            # Callback gauges report {label tuple: value} computed at scrape time
+            items = list(self._function().items())
+        else:
+            with self._lock:
+                items = list(self._values.items())
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+                for key, value in items]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket counts (last slot is +Inf), then sum and count
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def _samples(self):
+        with self._lock:
+            items = [(key, list(series[0]), series[1], series[2])
+                     for key, series in self._series.items()]
+        lines = []
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = 'le="%s"' % _format_value(bound)
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class Metrics:
+    """Process-wide metric registry with Flask and SQLAlchemy instrumentation.
+
+    Every request records latency, sizes, status and the number and total time
+    of SQL statements it issued. Metrics are rendered in the Prometheus text
+    exposition format at METRICS_PATH.
+    """
+
+    def __init__(self, app=None):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+        self.requests_total = self.counter(
+            'http_requests_total', 'Total HTTP requests.', ('method', 'endpoint', 'status'))
+        self.request_latency = self.histogram(
+            'http_request_duration_seconds', 'HTTP request latency.', ('method', 'endpoint'))
+        self.request_size = self.histogram(
+            'http_request_size_bytes', 'HTTP request body size.', ('method', 'endpoint'),
+            buckets=DEFAULT_SIZE_BUCKETS)
+        self.response_size = self.histogram(
+            'http_response_size_bytes', 'HTTP response body size.', ('method', 'endpoint'),
+            buckets=DEFAULT_SIZE_BUCKETS)
+        self.sql_statements = self.histogram(
+            'db_statements_per_request', 'SQL statements executed per request.', ('endpoint',),
+            buckets=DEFAULT_COUNT_BUCKETS)
+        self.sql_time = self.histogram(
+            'db_time_per_request_seconds', 'Time spent in SQL per request.', ('endpoint',))
+        self.smtp_latency = self.histogram(
+            'smtp_send_duration_seconds', 'Time spent sending mail over SMTP.', ('outcome',))
+
+        if app is not None:
+            self.init_app(app)
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                return self._metrics[metric.name]
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=(), function=None):
+        return self._register(Gauge(name, documentation, labelnames, function))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def init_app(self, app):
+        app.config.setdefault('METRICS_ENABLED', True)
+        app.config.setdefault('METRICS_PATH', '/metrics')
+        app.extensions['metrics'] = self
+        if not app.config['METRICS_ENABLED']:
+            return
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.add_url_rule(app.config['METRICS_PATH'], 'metrics', self._expose, methods=['GET'])
+        self._listen_engine()
+
+    def _listen_engine(self):
+        # Listening on the Engine class covers every engine the app creates
+        if event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            return
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+
+    def _expose(self):
+        return Response(self.render(), mimetype='text/plain', headers={
+            'Content-Type': 'text/plain; version=0.0.4; charset=utf-8',
+        })
+
+    def _before_request(self):
+        g._metrics_start = time.perf_counter()
+        g._sql_count = 0
+        g._sql_time = 0.0
+
+    def _after_request(self, response):
+        start = g.pop('_metrics_start', None)
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        endpoint = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+        method = request.method
+
+        self.requests_total.inc(method=method, endpoint=endpoint, status=response.status_code)
+        self.request_latency.observe(elapsed, method=method, endpoint=endpoint)
+        self.request_size.observe(request.content_length or 0, method=method, endpoint=endpoint)
+        if response.content_length is not None:
+            self.response_size.observe(response.content_length, method=method, endpoint=endpoint)
+        self.sql_statements.observe(g.pop('_sql_count', 0), endpoint=endpoint)
+        self.sql_time.observe(g.pop('_sql_time', 0.0), endpoint=endpoint)
+        return response
+
+    def observe_smtp(self, seconds, ok=True):
+        self.smtp_latency.observe(seconds, outcome='ok' if ok else 'error')
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('_query_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    if has_request_context() and '_sql_count' in g:
+        g._sql_count += 1
+        g._sql_time += elapsed
+
+
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute, so drop its start time here
+    if context.connection is None or context.statement is None:
+        return
+    starts = context.connection.info.get('_query_start')
+    if starts:
+        starts.pop()
@@ -0,0 +1,42 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateIndex
+
+
+def upgrade_schema(db, retired_indexes=()):
+    """Bring an existing database up to date with the models.
+
+    db.create_all() only creates missing tables, so columns and indexes added
+    to existing models are created here with ALTER TABLE / CREATE INDEX. New
+    columns must be nullable or carry a server default for this to work on
+    SQLite; foreign keys on them are added as REFERENCES clauses. Indexes
+    named in retired_indexes are dropped if they still exist.
+    """
+    db.create_all()
+    upgrade_tables(db.engine, db.metadata.sorted_tables, retired_indexes)
+
+
+def upgrade_tables(engine, tables, retired_indexes=()):
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                ddl = f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'
+                for foreign_key in column.foreign_keys:
+                    target = foreign_key.column
+                    ddl += f' REFERENCES "{target.table.name}" ("{target.name}")'
+                if column.server_default is not None:
+                    ddl += f' DEFAULT {column.server_default.arg.text}'
+                conn.execute(text(ddl))
+
+            indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in indexes:
+                    conn.execute(CreateIndex(index))
+            for name in indexes & set(retired_indexes):
+                conn.execute(text(f'DROP INDEX "{name}"'))
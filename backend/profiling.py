@@ -0,0 +1,266 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from urllib.parse import urlencode
+
+from flask import abort, g, has_request_context, jsonify, request, send_from_directory
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+# Query parameters that carry credentials; their values never reach a dump
+REDACTED_PARAMS = {'jwt', 'token', 'access_token', 'refresh_token', 'signature', 'password'}
+
+
+class StackSampler:
+    """Background thread that samples the stacks of watched request threads.
+
+    The thread blocks on an event while no request is being watched, so an
+    idle server pays nothing for it.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._watched = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='profiler-sampler', daemon=True)
+            self._thread.start()
+
+    def watch(self, thread_id):
+        samples = Counter()
+        with self._lock:
+            self._watched[thread_id] = samples
+            self._wakeup.set()
+        return samples
+
+    def unwatch(self, thread_id):
+        with self._lock:
+            samples = self._watched.pop(thread_id, None)
+            if not self._watched:
+                self._wakeup.clear()
+        return samples
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, samples in self._watched.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        samples[_stack_key(frame)] += 1
+            time.sleep(self.interval)
+
+
+def _stack_key(frame):
+    # Just code objects and line numbers, innermost first; formatting waits until a profile is kept
+    key = []
+    while frame is not None:
+        key.append((frame.f_code, frame.f_lineno))
+        frame = frame.f_back
+    return tuple(key)
+
+
+def _collapse(key):
+    return ';'.join(
+        f'{code.co_name} ({os.path.basename(code.co_filename)}:{lineno})' for code, lineno in reversed(key)
+    )
+
+
+def redacted_query_string():
+    return urlencode([
+        (name, 'redacted' if name.lower() in REDACTED_PARAMS else value)
+        for name, value in request.args.items(multi=True)
+    ])
+
+
+class RequestProfiler:
+    """Opt-in profiling of sampled and slow requests.
+
+    A random PROFILER_SAMPLE_RATE fraction of requests runs under cProfile.
+    When PROFILER_SLOW_THRESHOLD is set, a PROFILER_WATCH_RATE fraction of
+    the other requests is watched by a statistical stack sampler and its
+    profile is kept only if the request turns out to be slower than the
+    threshold. Profiles, request metadata (with credentials in the query
+    string redacted) and the SQL statements issued are written to
+    PROFILER_DIR, which keeps only the newest PROFILER_MAX_PROFILES entries.
+
+    protect is a view decorator applied to the /admin/profiles routes.
+    """
+
+    def __init__(self, app=None, protect=None):
+        self.sampler = None
+        self.protect = protect
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PROFILER_ENABLED', False)
+        app.config.setdefault('PROFILER_SAMPLE_RATE', 0.0)
+        app.config.setdefault('PROFILER_SLOW_THRESHOLD', None)
+        app.config.setdefault('PROFILER_WATCH_RATE', 0.1)
+        app.config.setdefault('PROFILER_SAMPLE_INTERVAL', 0.005)
+        app.config.setdefault('PROFILER_DIR', os.path.join(app.root_path, 'logs', 'profiles'))
+        app.config.setdefault('PROFILER_MAX_PROFILES', 100)
+        app.extensions['profiler'] = self
+        self.app = app
+        if not app.config['PROFILER_ENABLED']:
+            return
+
+        os.makedirs(app.config['PROFILER_DIR'], exist_ok=True)
+        if app.config['PROFILER_SLOW_THRESHOLD'] is not None:
+            self.sampler = StackSampler(app.config['PROFILER_SAMPLE_INTERVAL'])
+            self.sampler.start()
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        protect = self.protect or (lambda view: view)
+        app.add_url_rule('/admin/profiles', 'list_profiles', protect(self.list_profiles), methods=['GET'])
+        app.add_url_rule('/admin/profiles/<name>', 'download_profile', protect(self.download_profile), methods=['GET'])
+        if not event.contains(Engine, 'after_cursor_execute', _record_statement):
+            event.listen(Engine, 'before_cursor_execute', _statement_started)
+            event.listen(Engine, 'after_cursor_execute', _record_statement)
+
+    def _before_request(self):
+        if request.endpoint in ('list_profiles', 'download_profile', 'metrics'):
+            return
+        config = self.app.config
+        if config['PROFILER_SAMPLE_RATE'] and random.random() < config['PROFILER_SAMPLE_RATE']:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Another thread already owns the interpreter-wide profiler
+                profile = None
+            if profile is not None:
+                g._profile = profile
+        elif self.sampler is not None and random.random() < config['PROFILER_WATCH_RATE']:
+            g._profile_samples = self.sampler.watch(threading.get_ident())
+        else:
+            return
+        g._profile_start = time.perf_counter()
+        g._profile_sql = []
+
+    def _after_request(self, response):
+        start = g.pop('_profile_start', None)
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        profile = g.pop('_profile', None)
+        statements = g.pop('_profile_sql', [])
+
+        if profile is not None:
+            profile.disable()
+            self._dump(elapsed, response, statements, 'cprofile', profile=profile)
+        elif '_profile_samples' in g:
+            g.pop('_profile_samples')
+            samples = self.sampler.unwatch(threading.get_ident())
+            if elapsed >= self.app.config['PROFILER_SLOW_THRESHOLD']:
+                self._dump(elapsed, response, statements, 'sampler', samples=samples)
+        return response
+
+    def _teardown_request(self, exc):
+        # Unhandled errors skip after_request; make sure nothing is left running
+        profile = g.pop('_profile', None)
+        if profile is not None:
+            profile.disable()
+        if g.pop('_profile_samples', None) is not None:
+            self.sampler.unwatch(threading.get_ident())
+        g.pop('_profile_start', None)
+
+    def _dump(self, elapsed, response, statements, kind, profile=None, samples=None):
+        directory = self.app.config['PROFILER_DIR']
+        stem = '%s-%s' % (time.strftime('%Y%m%d-%H%M%S'), uuid.uuid4().hex[:8])
+        record = {
+            'id': stem,
+            'kind': kind,
+            'method': request.method,
+            'path': request.path,
+            'query_string': redacted_query_string(),
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'duration_ms': round(elapsed * 1000, 3),
+            'remote_addr': request.remote_addr,
+            'user_agent': request.headers.get('User-Agent'),
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'sql': [{'statement': statement, 'duration_ms': round(duration * 1000, 3)}
+                    for statement, duration in statements],
+        }
+        if profile is not None:
+            profile.dump_stats(os.path.join(directory, stem + '.prof'))
+            text = io.StringIO()
+            pstats.Stats(profile, stream=text).sort_stats('cumulative').print_stats(40)
+            record['summary'] = text.getvalue()
+        else:
+            record['samples'] = {_collapse(key): count for key, count in samples.most_common()} if samples else {}
+
+        with open(os.path.join(directory, stem + '.json'), 'w') as handle:
+            json.dump(record, handle, indent=2)
+        self._rotate(directory)
+
+    def _rotate(self, directory):
+        stems = sorted({os.path.splitext(name)[0] for name in os.listdir(directory)}, reverse=True)
+        for stem in stems[self.app.config['PROFILER_MAX_PROFILES']:]:
+            for suffix in ('.json', '.prof'):
+                try:
+                    os.remove(os.path.join(directory, stem + suffix))
+                except FileNotFoundError:
+                    pass
+
+    def list_profiles(self):
+        directory = self.app.config['PROFILER_DIR']
+        profiles = []
+        for name in sorted(os.listdir(directory), reverse=True):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(directory, name)) as handle:
+                    record = json.load(handle)
+            except (OSError, ValueError):
+                continue
+            stem = record['id']
+            files = [stem + '.json']
+            if os.path.exists(os.path.join(directory, stem + '.prof')):
+                files.append(stem + '.prof')
+            profiles.append({
+                'id': stem,
+                'kind': record['kind'],
+                'method': record['method'],
+                'path': record['path'],
+                'status': record['status'],
+                'duration_ms': record['duration_ms'],
+                'sql_count': len(record['sql']),
+                'created_at': record['created_at'],
+                'files': files,
+            })
+        return jsonify(profiles), 200
+
+    def download_profile(self, name):
+        if os.path.splitext(name)[1] not in ('.json', '.prof'):
+            abort(404)
+        return send_from_directory(self.app.config['PROFILER_DIR'], name, as_attachment=True)
+
+
+def _statement_started(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and '_profile_sql' in g:
+        conn.info['_profile_query_start'] = time.perf_counter()
+
+
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop('_profile_query_start', None)
+    if started is not None and has_request_context() and '_profile_sql' in g:
+        g._profile_sql.append((statement, time.perf_counter() - started))
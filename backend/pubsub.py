@@ -0,0 +1,143 @@
+import json
+import logging
+import queue
+import threading
+import time
+
+try:
+    import redis
+except ImportError:  # redis is only needed for the shared backend
+    redis = None
+
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """A subscriber's bounded inbox. Slow readers lose their oldest messages."""
+
+    def __init__(self, broker, topic, maxsize):
+        self._broker = broker
+        self.topic = topic
+        self._queue = queue.Queue(maxsize)
+
+    def put(self, message):
+        while True:
+            try:
+                self._queue.put_nowait(message)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None):
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self._broker.unsubscribe(self)
+
+
+class LocalBackend:
+    """Delivers messages to subscribers in this process only."""
+
+    def start(self, deliver):
+        self._deliver = deliver
+
+    def publish(self, topic, message):
+        self._deliver(topic, message)
+
+
+class RedisBackend:
+    """Shares messages between worker processes through Redis pub/sub.
+
+    Each process runs one listener thread that receives every message on the
+    channel and hands it to the local broker, which fans it out to its own
+    subscribers. If the connection drops the thread resubscribes, waiting
+    twice as long after each failed attempt up to max_backoff seconds;
+    messages published in the meantime are lost, and clients catch up with
+    Last-Event-ID when they reconnect.
+    """
+
+    def __init__(self, url, channel='bursary-events', max_backoff=30):
+        if redis is None:
+            raise RuntimeError('The redis package is required for a redis:// PUBSUB_URL')
+        self._client = redis.Redis.from_url(url)
+        self._channel = channel
+        self._max_backoff = max_backoff
+
+    def start(self, deliver):
+        threading.Thread(target=self._listen, args=(deliver,), name='pubsub-redis', daemon=True).start()
+
+    def _listen(self, deliver):
+        backoff = 0.5
+        while True:
+            pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(self._channel)
+                backoff = 0.5
+                for item in pubsub.listen():
+                    payload = json.loads(item['data'])
+                    deliver(payload['topic'], payload['message'])
+            except redis.RedisError:
+                logger.warning('Lost the Redis pub/sub connection, retrying in %.1fs', backoff, exc_info=True)
+            finally:
+                pubsub.close()
+            time.sleep(backoff)
+            backoff = min(backoff * 2, self._max_backoff)
+
+    def publish(self, topic, message):
+        self._client.publish(self._channel, json.dumps({'topic': topic, 'message': message}))
+
+
+class Broker:
+    """Topic-based publish/subscribe with a pluggable transport.
+
+    Subscribers are indexed by topic, so a publish only touches the
+    connections listening on that topic and idle subscribers cost one
+    queue each.
+    """
+
+    def __init__(self, backend=None, maxsize=100):
+        self._topics = {}
+        self._lock = threading.Lock()
+        self._maxsize = maxsize
+        self.backend = backend or LocalBackend()
+        self.backend.start(self._deliver)
+
+    def subscribe(self, topic):
+        subscription = Subscription(self, topic, self._maxsize)
+        with self._lock:
+            self._topics.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._topics.get(subscription.topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._topics[subscription.topic]
+
+    def publish(self, topic, message):
+        self.backend.publish(topic, message)
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._topics.values())
+
+    def _deliver(self, topic, message):
+        with self._lock:
+            subscribers = list(self._topics.get(topic, ()))
+        for subscription in subscribers:
+            subscription.put(message)
+
+
+def create_broker(url=None, maxsize=100):
+    if url and url.startswith('redis://'):
+        return Broker(RedisBackend(url), maxsize)
+    return Broker(LocalBackend(), maxsize)
@@ -0,0 +1,188 @@
+import math
+import threading
+import time
+
+from flask import g, jsonify, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt.exceptions import PyJWTError
+
+
+class TokenBuckets:
+    """Per-client token buckets refilled at rate tokens per second up to burst.
+
+    Buckets are spread over striped locks, so concurrent clients rarely
+    contend, and a bucket is only two floats. Buckets that have refilled
+    completely are pruned when a stripe grows past its share of max_clients.
+    """
+
+    def __init__(self, rate, burst, max_clients=10000, stripes=16):
+        self.rate = rate
+        self.burst = burst
+        self._stripe_limit = max(1, max_clients // stripes)
+        self._stripes = [({}, threading.Lock()) for _ in range(stripes)]
+
+    def take(self, client):
+        """Take a token. Returns 0 if one was available, else seconds until one is."""
+        buckets, lock = self._stripes[hash(client) % len(self._stripes)]
+        now = time.monotonic()
+        with lock:
+            tokens, last = buckets.get(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens >= 1:
+                buckets[client] = (tokens - 1, now)
+                wait = 0.0
+            else:
+                buckets[client] = (tokens, now)
+                wait = (1 - tokens) / self.rate
+            if len(buckets) > self._stripe_limit:
+                self._prune(buckets, now)
+        return wait
+
+    def _prune(self, buckets, now):
+        for client, (tokens, last) in list(buckets.items()):
+            if tokens + (now - last) * self.rate >= self.burst:
+                del buckets[client]
+
+
+class ConcurrencyLimit:
+    """At most limit requests in flight, with up to queue more waiting for wait seconds."""
+
+    def __init__(self, limit, queue=0, wait=0):
+        self.limit = limit
+        self.queue = queue
+        self.wait = wait
+        self._slots = threading.Semaphore(limit)
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self.in_flight = 0
+
+    @property
+    def busy(self):
+        return self.in_flight + self._waiting
+
+    def acquire(self, may_wait=True):
+        acquired = self._slots.acquire(blocking=False)
+        if not acquired and may_wait and self.queue > 0 and self.wait > 0:
+            with self._lock:
+                if self._waiting >= self.queue:
+                    return False
+                self._waiting += 1
+            try:
+                acquired = self._slots.acquire(timeout=self.wait)
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+        if acquired:
+            with self._lock:
+                self.in_flight += 1
+        return acquired
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+
+class _Policy:
+    def __init__(self, rate=None, burst=None, concurrency=None, queue=0, wait=0):
+        self.buckets = TokenBuckets(rate, burst or max(1, int(rate))) if rate else None
+        self.slots = ConcurrencyLimit(concurrency, queue, wait) if concurrency else None
+        self.retry_after = max(1, math.ceil(wait))
+
+
+def client_key():
+    """The authenticated user when the request carries a valid access token, else the client address.
+
+    remote_addr is the proxy's address behind a reverse proxy unless
+    PROXY_FIX_HOPS is set, which would put every client in one bucket.
+    """
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+    except (JWTExtendedException, PyJWTError):
+        identity = None  # the view itself rejects bad tokens
+    return f'user:{identity}' if identity is not None else f'addr:{request.remote_addr or ""}'
+
+
+class AdmissionControl:
+    """Rejects requests early instead of letting expensive endpoints pile up.
+
+    ADMISSION_LIMITS maps endpoint names to a policy:
+    rate/burst give each client (see client_key) a token bucket, and
+    concurrency/queue/wait bound how many requests run or wait at once.
+    A waiting request ties up a server thread, so requests only queue while
+    fewer than SERVER_THREADS - 1 threads are running or waiting in limited
+    routes; past that they are rejected at once, leaving a thread for
+    everything else (0 means no cap, e.g. under gevent).
+    Clients over their rate get 429 and requests that find the route
+    saturated get 503, both with Retry-After. Views marked with exempt are
+    never limited; use it for long-lived responses such as event streams.
+    """
+
+    def __init__(self, app=None, metrics=None):
+        self._policies = {}
+        self._exempt = set()
+        self._rejected = None
+        self._metrics = metrics
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('ADMISSION_CONTROL_ENABLED', True)
+        app.config.setdefault('ADMISSION_LIMITS', {})
+        app.config.setdefault('SERVER_THREADS', 8)
+        app.extensions['admission_control'] = self
+        if not app.config['ADMISSION_CONTROL_ENABLED']:
+            return
+
+        self._policies = {
+            endpoint: _Policy(**limits) for endpoint, limits in app.config['ADMISSION_LIMITS'].items()
+        }
+        self._limits = [policy.slots for policy in self._policies.values() if policy.slots]
+        self._threads = app.config['SERVER_THREADS']
+        if self._metrics is not None:
+            self._rejected = self._metrics.counter(
+                'admission_rejected_total', 'Requests rejected by admission control.', ('endpoint', 'reason'))
+            self._metrics.gauge(
+                'admission_in_flight', 'Requests holding a concurrency slot.', ('endpoint',),
+                function=lambda: {
+                    (endpoint,): policy.slots.in_flight
+                    for endpoint, policy in self._policies.items() if policy.slots
+                })
+        app.before_request(self._before_request)
+        app.teardown_request(self._release)
+
+    def exempt(self, view):
+        self._exempt.add(view.__name__)
+        return view
+
+    def _before_request(self):
+        if request.endpoint in self._exempt:
+            return None
+        policy = self._policies.get(request.endpoint)
+        if policy is None:
+            return None
+        if policy.buckets is not None:
+            wait = policy.buckets.take(client_key())
+            if wait:
+                return self._reject(429, wait, 'rate', 'Too many requests. Please slow down and try again.')
+        if policy.slots is not None:
+            may_wait = not self._threads or sum(limit.busy for limit in self._limits) < self._threads - 1
+            if not policy.slots.acquire(may_wait):
+                return self._reject(503, policy.retry_after, 'busy', 'The server is busy. Please try again shortly.')
+            g._admission_slot = policy.slots
+        return None
+
+    def _release(self, exc):
+        slots = g.pop('_admission_slot', None)
+        if slots is not None:
+            slots.release()
+
+    def _reject(self, status, retry_after, reason, message):
+        if self._rejected is not None:
+            self._rejected.inc(endpoint=request.endpoint, reason=reason)
+        response = jsonify({"success": False, "message": message})
+        response.status_code = status
+        response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+        return response
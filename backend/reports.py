@@ -0,0 +1,180 @@
+import csv
+import io
+import zlib
+from datetime import datetime
+
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+MARGIN = 40
+FONT_SIZE = 9
+LINE_HEIGHT = 14
+
+
+def stream_csv(header, rows, batch=500):
+    """Yield CSV text in batches of rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % batch == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _escape(text):
+    text = str(text).encode('latin-1', 'replace').decode('latin-1')
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def _fit(text, width):
+    # Helvetica averages about half an em per character
+    limit = max(1, int(width / (FONT_SIZE * 0.5)))
+    text = str(text)
+    return text if len(text) <= limit else text[:limit - 1] + '~'
+
+
+class PdfWriter:
+    """Minimal PDF writer that emits each page as soon as it is complete.
+
+    Object numbers 1 and 2 are reserved for the catalog and page tree, which
+    are written last together with the cross-reference table, so nothing but
+    the current page and the list of object offsets is held in memory.
+    """
+
+    def __init__(self):
+        self._offsets = {}
+        self._position = 0
+        self._next_id = 5
+        self._pages = []
+
+    def _object(self, number, body):
+        self._offsets[number] = self._position
+        data = b'%d 0 obj\n' % number + body + b'\nendobj\n'
+        self._position += len(data)
+        return data
+
+    def _emit(self, data):
+        self._position += len(data)
+        return data
+
+    def start(self):
+        chunks = [self._emit(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')]
+        chunks.append(self._object(3, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>'))
+        chunks.append(self._object(4, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>'))
+        return b''.join(chunks)
+
+    def page(self, operations):
+        content = zlib.compress('\n'.join(operations).encode('latin-1'))
+        content_id, page_id = self._next_id, self._next_id + 1
+        self._next_id += 2
+        self._pages.append(page_id)
+        return self._object(
+            content_id,
+            b'<< /Length %d /Filter /FlateDecode >>\nstream\n' % len(content) + content + b'\nendstream'
+        ) + self._object(
+            page_id,
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] '
+            b'/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents %d 0 R >>'
+            % (PAGE_WIDTH, PAGE_HEIGHT, content_id)
+        )
+
+    def finish(self):
+        kids = b' '.join(b'%d 0 R' % page_id for page_id in self._pages)
+        chunks = [
+            self._object(2, b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, len(self._pages))),
+            self._object(1, b'<< /Type /Catalog /Pages 2 0 R >>'),
+        ]
+        xref_offset = self._position
+        size = self._next_id
+        xref = [b'xref\n0 %d\n' % size, b'0000000000 65535 f \n']
+        for number in range(1, size):
+            xref.append(b'%010d 00000 n \n' % self._offsets[number])
+        chunks.append(b''.join(xref))
+        chunks.append(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (size, xref_offset))
+        return b''.join(chunks)
+
+
+def _text(x, y, text, bold=False, align='left', width=0):
+    if align == 'right':
+        # Approximate right alignment using the average glyph width
+        x = x + width - len(text) * FONT_SIZE * 0.5
+    font = 'F2' if bold else 'F1'
+    return f'BT /{font} {FONT_SIZE} Tf {x:.1f} {y:.1f} Td ({_escape(text)}) Tj ET'
+
+
+def stream_pdf_report(title, columns, rows, group_label='Ward'):
+    """Yield a paginated PDF table, one page at a time.
+
+    columns is a list of (label, width, align). rows yields (group, values)
+    with rows already ordered by group. Each group starts on a new page and
+    ends with a subtotal of the last column.
+    """
+    writer = PdfWriter()
+    yield writer.start()
+
+    generated = datetime.now().strftime('%Y-%m-%d %H:%M')
+    usable_rows = (PAGE_HEIGHT - 2 * MARGIN - 4 * LINE_HEIGHT) // LINE_HEIGHT
+    state = {'page': 0, 'ops': [], 'y': 0, 'lines': 0}
+
+    def new_page(group):
+        state['page'] += 1
+        y = PAGE_HEIGHT - MARGIN
+        ops = [
+            _text(MARGIN, y, title, bold=True),
+            _text(PAGE_WIDTH - MARGIN - 150, y, f'Page {state["page"]}  {generated}'),
+        ]
+        y -= LINE_HEIGHT * 1.5
+        ops.append(_text(MARGIN, y, f'{group_label}: {group}', bold=True))
+        y -= LINE_HEIGHT * 1.5
+        x = MARGIN
+        for label, width, align in columns:
+            ops.append(_text(x, y, _fit(label, width), bold=True, align=align, width=width))
+            x += width
+        ops.append(f'{MARGIN} {y - 4:.1f} m {PAGE_WIDTH - MARGIN} {y - 4:.1f} l S')
+        state.update(ops=ops, y=y - LINE_HEIGHT, lines=0)
+
+    def add_line(values, bold=False):
+        x = MARGIN
+        for value, (_, width, align) in zip(values, columns):
+            if isinstance(value, float):
+                value = f'{value:,.2f}'
+            elif value is None:
+                value = ''
+            state['ops'].append(_text(x, state['y'], _fit(value, width), bold=bold, align=align, width=width))
+            x += width
+        state['y'] -= LINE_HEIGHT
+        state['lines'] += 1
+
+    def add_subtotal():
+        values = [''] * len(columns)
+        values[1 if len(columns) > 2 else 0] = f'{count} students'
+        values[-1] = f'{subtotal:,.2f}'
+        add_line(values, bold=True)
+
+    current_group = None
+    subtotal = 0.0
+    count = 0
+    for group, values in rows:
+        if group != current_group:
+            if current_group is not None:
+                add_subtotal()
+                yield writer.page(state['ops'])
+            current_group, subtotal, count = group, 0.0, 0
+            new_page(group)
+        elif state['lines'] >= usable_rows:
+            yield writer.page(state['ops'])
+            new_page(f'{group} (continued)')
+        add_line(values)
+        subtotal += float(values[-1] or 0)
+        count += 1
+
+    if current_group is None:
+        new_page('-')
+        add_line(['No matching applications'] + [''] * (len(columns) - 1))
+    else:
+        add_subtotal()
+    yield writer.page(state['ops'])
+    yield writer.finish()
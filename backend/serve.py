@@ -0,0 +1,45 @@
+"""Run the API server: python serve.py (python app.py ends up here too).
+
+Nothing is built when this module is imported. Document workers are spawned
+processes that re-import the main module, and this keeps that cheap.
+
+SERVER=gevent serves with gevent instead of the Flask development server.
+Each open status event stream then holds a greenlet instead of a thread,
+so thousands of applicants can keep a stream open. Start it with
+python serve.py, so the standard library is patched before anything else
+is imported.
+"""
+import os
+
+
+def main():
+    server = os.getenv('SERVER', 'flask')
+    if server == 'gevent':
+        from gevent import monkey
+        monkey.patch_all()
+
+    from app import (
+        RETIRED_INDEXES, app, backfill_cycles, backfill_lookups, backfill_typed_columns, db, link_users,
+        requeue_pending_documents, upgrade_schema
+    )
+
+    # Ensure database is created
+    with app.app_context():
+        upgrade_schema(db, RETIRED_INDEXES)
+        backfill_typed_columns()
+        backfill_cycles()
+        backfill_lookups()
+        link_users()
+        requeue_pending_documents()
+
+    host, port = os.getenv('HOST', '0.0.0.0'), int(os.getenv('PORT', 5000))
+    if server == 'gevent':
+        from gevent.pywsgi import WSGIServer
+        WSGIServer((host, port), app).serve_forever()
+    else:
+        # Run the Flask app
+        app.run(debug=True, host=host, port=port)
+
+
+if __name__ == '__main__':
+    main()
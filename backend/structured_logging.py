@@ -0,0 +1,121 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from flask import g, has_request_context, request
+
+
+_RESERVED = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'request_id'}
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp every record with the id of the request it was logged from."""
+
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = getattr(g, 'request_id', None)
+            record.method = request.method
+            record.path = request.path
+        else:
+            record.request_id = None
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None),
+            'module': record.module,
+            'line': record.lineno,
+            'thread': record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and key not in entry:
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        if record.stack_info:
+            entry['stack'] = record.stack_info
+        return json.dumps(entry, default=str)
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    def prepare(self, record):
+        # Render the message and traceback on the calling thread, but leave
+        # the JSON formatting and the file write to the listener thread.
+        message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record = logging.makeLogRecord(vars(record))
+        record.msg = message
+        record.message = message
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Dropping a line is preferable to stalling a request thread
+            pass
+
+
+def init_logging(app):
+    """Route the app's logging through a queue to a background file writer.
+
+    Request threads only put records on an in-memory queue; a QueueListener
+    thread formats them as JSON lines and writes them to LOG_FILE, rotating
+    by size. Every request gets an id (taken from X-Request-ID when present)
+    that is attached to each line and echoed back in the response.
+    """
+    app.config.setdefault('LOG_FILE', os.path.join(app.root_path, 'logs', 'bursary_app.log'))
+    app.config.setdefault('LOG_LEVEL', 'INFO')
+    app.config.setdefault('LOG_MAX_BYTES', 10 * 1024 * 1024)
+    app.config.setdefault('LOG_BACKUP_COUNT', 5)
+    app.config.setdefault('LOG_QUEUE_SIZE', 10000)
+
+    os.makedirs(os.path.dirname(app.config['LOG_FILE']), exist_ok=True)
+    file_handler = RotatingFileHandler(
+        app.config['LOG_FILE'],
+        maxBytes=app.config['LOG_MAX_BYTES'],
+        backupCount=app.config['LOG_BACKUP_COUNT'],
+        encoding='utf-8',
+    )
+    file_handler.setFormatter(JsonFormatter())
+
+    log_queue = queue.Queue(app.config['LOG_QUEUE_SIZE'])
+    queue_handler = _NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(RequestIdFilter())
+
+    listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    app.logger.handlers[:] = [queue_handler]
+    app.logger.setLevel(app.config['LOG_LEVEL'])
+    app.logger.propagate = False
+    app.extensions['log_listener'] = listener
+
+    @app.before_request
+    def assign_request_id():
+        g.request_id = request.headers.get('X-Request-ID', '')[:64] or uuid.uuid4().hex
+
+    @app.after_request
+    def echo_request_id(response):
+        if 'request_id' in g:
+            response.headers['X-Request-ID'] = g.request_id
+        return response
+
+    return listener
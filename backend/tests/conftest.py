@@ -0,0 +1,76 @@
+import os
+import sys
+import tempfile
+from datetime import date
+
+import pytest
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRATCH = tempfile.mkdtemp(prefix='bursary-tests-')
+
+# The app reads its configuration at import time
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{os.path.join(SCRATCH, 'test.db')}",
+    LOG_FILE=os.path.join(SCRATCH, 'test.log'),
+    BACKUP_FOLDER=os.path.join(SCRATCH, 'backups'),
+    JWT_SECRET_KEY='test-secret-key-that-is-long-enough-for-hs256',
+    DOCUMENT_WORKERS='0',
+    ADMISSION_CONTROL_ENABLED='false',
+    DB_READ_ROUTING='false',
+)
+sys.path.insert(0, BACKEND)
+
+
+@pytest.fixture(scope='session')
+def bursary():
+    import app as bursary
+    return bursary
+
+
+@pytest.fixture
+def app(bursary):
+    with bursary.app.app_context():
+        bursary.db.drop_all()
+        bursary.upgrade_schema(bursary.db, bursary.RETIRED_INDEXES)
+    bursary.cache.clear()
+    yield bursary.app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth_header(bursary, app):
+    """Returns a function that creates a user with the given role and an Authorization header for them."""
+    def make(role='applicant', admission='ADM1'):
+        with app.app_context():
+            user = bursary.User(
+                full_name='Test User', admission_number=admission, institution_name='Test School',
+                email=f'{admission.lower()}@example.com', phone_number='0700000000', password='x', role=role
+            )
+            bursary.db.session.add(user)
+            bursary.db.session.commit()
+            access_token, _ = bursary.issue_tokens(user.id)
+            bursary.db.session.commit()
+        return {'Authorization': f'Bearer {access_token}'}
+    return make
+
+
+@pytest.fixture
+def add_applicant(bursary, app):
+    """Returns a function that inserts an applicant and returns its id."""
+    def make(admission, institution_type='Secondary', **columns):
+        applicant = bursary.Applicant(**{
+            'full_name': 'Test Applicant', 'admission': admission, 'gender': 'Female', 'form': 'Form 3',
+            'dob': '2008-01-01', 'birth_date': date(2008, 1, 1), 'national_id': '12345678',
+            'phone_number': '0700000000', 'email': f'{admission.lower()}@example.com',
+            'institution_type': institution_type, 'institution_name': 'Aden School',
+            'constituency': 'Central', 'ward': 'North', **columns
+        })
+        with app.app_context():
+            bursary.db.session.add(applicant)
+            bursary.db.session.commit()
+            return applicant.id
+    return make
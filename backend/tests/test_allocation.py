@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from allocation import allocate, need_scores
+
+
+def test_tied_incomes_get_the_same_score():
+    scores = need_scores([5000, 20000, 20000, 20000, 90000], ['Secondary'] * 5)
+    assert scores[1] == scores[2] == scores[3]
+    assert scores[0] == 1.0
+    assert scores[0] > scores[1] > scores[4]
+
+
+def test_ties_do_not_depend_on_input_order():
+    incomes = [0, 0, 0, 10000]
+    forward = need_scores(incomes, ['Secondary'] * 4)
+    backward = need_scores(incomes[::-1], ['Secondary'] * 4)[::-1]
+    np.testing.assert_array_equal(forward, backward)
+
+
+def test_student_skipped_for_a_full_ward_does_not_use_budget():
+    # The second student does not fit ward 0, which leaves room for the third
+    amounts = allocate(
+        [3.0, 2.0, 1.0], [0, 0, 1], [0, 0, 0], budget=20,
+        ward_caps=[10, np.inf], type_caps=[np.inf], min_award=10
+    )
+    np.testing.assert_array_equal(amounts, [10, 0, 10])
+
+
+def test_rounding_keeps_the_minimum_award():
+    # 0.29 * 100 floors to 28 cents in floating point
+    amounts = allocate([1.0, 1.0], [0, 0], [0, 0], budget=0.58,
+                       ward_caps=[np.inf], type_caps=[np.inf], min_award=0.29)
+    np.testing.assert_array_equal(amounts, [0.29, 0.29])
+
+
+def test_fractional_minimum_is_rounded_up_to_cents():
+    amounts = allocate([2.0, 1.0], [0, 0], [0, 0], budget=100,
+                       ward_caps=[np.inf], type_caps=[np.inf], min_award=10.005, max_award=10.01)
+    np.testing.assert_array_equal(amounts, [10.01, 10.01])
+
+
+def test_minimum_rounded_past_the_maximum_is_rejected():
+    with pytest.raises(ValueError):
+        allocate([2.0, 1.0], [0, 0], [0, 0], budget=100,
+                 ward_caps=[np.inf], type_caps=[np.inf], min_award=10.005, max_award=10.005)
@@ -0,0 +1,13 @@
+from sqlalchemy import text
+
+
+def test_primary_runs_in_wal_mode_without_read_routing(app, bursary):
+    assert not app.config['DB_READ_ROUTING']
+    with app.app_context():
+        assert bursary.db.session.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+
+
+def test_backup_list_requires_an_administrator(client, auth_header):
+    assert client.get('/backups').status_code == 401
+    assert client.get('/backups', headers=auth_header('applicant')).status_code == 403
+    assert client.get('/backups', headers=auth_header('admin', 'ADM2')).status_code == 200
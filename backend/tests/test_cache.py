@@ -0,0 +1,43 @@
+import pytest
+
+from cache import Cache, MemoryBackend, SQLiteBackend
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def cache(request, tmp_path):
+    if request.param == 'memory':
+        return Cache(MemoryBackend())
+    return Cache(SQLiteBackend(str(tmp_path / 'cache.db')))
+
+
+def test_reader_that_loaded_before_invalidation_cannot_recache(cache):
+    def stale_loader():
+        # The write commits and invalidates while this reader is still loading
+        cache.invalidate('applicant', 1)
+        return {'status': 'pending'}
+
+    assert cache.get_or_load('applicant', 1, stale_loader) == {'status': 'pending'}
+    assert cache.get_or_load('applicant', 1, lambda: {'status': 'approved'}) == {'status': 'approved'}
+
+
+def test_invalidated_key_is_not_cached_while_the_tombstone_lives(cache):
+    cache.get_or_load('applicant', 1, lambda: {'status': 'pending'})
+    cache.invalidate('applicant', 1)
+    # e.g. a replica that has not caught up yet
+    cache.get_or_load('applicant', 1, lambda: {'status': 'pending'})
+    assert cache.get_or_load('applicant', 1, lambda: {'status': 'approved'}) == {'status': 'approved'}
+
+
+def test_values_are_cached_again_once_the_tombstone_expires(tmp_path):
+    cache = Cache(MemoryBackend(), tombstone_ttl=0)
+    cache.invalidate('applicant', 1)
+    cache.get_or_load('applicant', 1, lambda: {'status': 'approved'})
+    assert cache.get_or_load('applicant', 1, lambda: None) == {'status': 'approved'}
+
+
+def test_clearing_the_server_cache_requires_an_administrator(client, auth_header):
+    assert client.post('/admin/cache/clear').status_code == 401
+    assert client.post('/admin/cache/clear', headers=auth_header('applicant')).status_code == 403
+    response = client.post('/admin/cache/clear', headers=auth_header('admin', 'ADM2'))
+    assert response.status_code == 200
+    assert response.get_json()['shared'] is False
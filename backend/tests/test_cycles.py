@@ -0,0 +1,110 @@
+from sqlalchemy import func, select
+
+from cycles import CycleArchive
+
+
+def add_application(bursary, admission, cycle, status='approved'):
+    with bursary.app.app_context():
+        bursary.db.session.add(bursary.BursaryApplication(
+            admission_number=admission, full_name='Test Applicant', email=f'{admission.lower()}@example.com',
+            family_income=10000, reason='Fees', status=status, cycle=cycle
+        ))
+        bursary.db.session.commit()
+
+
+def test_review_queue_only_counts_the_active_cycle(client, bursary, add_applicant, auth_header):
+    active = bursary.app.config['BURSARY_CYCLE']
+    add_applicant('ADM1', cycle=active)
+    add_applicant('OLD1', cycle=active - 1)
+    admin = auth_header('admin', 'ADMIN1')
+    assert client.get('/review-queue', headers=admin).get_json()['unclaimed'] == 1
+
+    claimed = client.post('/review-queue/claim', json={'limit': 10}, headers=admin).get_json()
+    assert [applicant['admission'] for applicant in claimed['applicants']] == ['ADM1']
+
+
+def test_review_leases_belong_to_the_signed_in_reviewer(client, add_applicant, auth_header):
+    first = add_applicant('ADM1')
+    second = add_applicant('ADM2')
+    alice = auth_header('admin', 'ADMIN1')
+    bob = auth_header('admin', 'ADMIN2')
+
+    assert client.post('/review-queue/claim', json={'limit': 1}).status_code == 401
+    assert client.post('/review-queue/claim', json={'limit': 1}, headers=auth_header()).status_code == 403
+
+    claimed = client.post('/review-queue/claim', json={'limit': 1, 'reviewer': 'bob'}, headers=alice).get_json()
+    assert [applicant['id'] for applicant in claimed['applicants']] == [first]
+    client.post('/review-queue/claim', json={'limit': 1}, headers=bob)
+
+    response = client.post('/review-queue/release', json={'ids': [first]}, headers=bob)
+    assert response.status_code == 403
+    # Releasing without ids only touches the caller's own leases
+    assert client.post('/review-queue/release', json={}, headers=bob).get_json()['released'] == 1
+    assert client.post('/review-queue/release', json={'ids': [first, second]}, headers=alice).get_json()['released'] == 1
+
+
+def test_allocation_ignores_other_cycles(client, bursary, add_applicant, auth_header):
+    active = bursary.app.config['BURSARY_CYCLE']
+    add_applicant('ADM1', cycle=active)
+    add_application(bursary, 'ADM1', active)
+    add_application(bursary, 'OLD1', active - 1)
+
+    assert client.post('/allocations', json={'budget': 1000, 'dry_run': True}).status_code == 401
+    result = client.post('/allocations', json={'budget': 1000, 'dry_run': True},
+                         headers=auth_header('admin', 'ADMIN1')).get_json()
+    assert result['funded'] == 1
+
+
+def test_ward_caps_are_kept_apart_for_wards_with_the_same_name(client, bursary, add_applicant, auth_header):
+    active = bursary.app.config['BURSARY_CYCLE']
+    with bursary.app.app_context():
+        central, east = bursary.Constituency(key='central', name='Central'), bursary.Constituency(key='east', name='East')
+        bursary.db.session.add_all([central, east])
+        bursary.db.session.flush()
+        north, east_north = (bursary.Ward(constituency_id=central.id, key='north', name='North'),
+                             bursary.Ward(constituency_id=east.id, key='north', name='North'))
+        bursary.db.session.add_all([north, east_north])
+        bursary.db.session.commit()
+        north_id, east_north_id = north.id, east_north.id
+    add_applicant('ADM1', cycle=active, ward_id=north_id)
+    add_applicant('ADM2', cycle=active, ward_id=east_north_id, constituency='East')
+    add_application(bursary, 'ADM1', active)
+    add_application(bursary, 'ADM2', active)
+
+    admin = auth_header('admin', 'ADMIN1')
+    result = client.post('/allocations', json={
+        'budget': 1000, 'dry_run': True, 'ward_caps': {str(north_id): 100}
+    }, headers=admin).get_json()
+    totals = {ward['ward_id']: ward['allocated'] for ward in result['by_ward']}
+    assert totals == {north_id: 100, east_north_id: 900}
+
+    # A ward name caps each ward of that name on its own rather than sharing one cap
+    result = client.post('/allocations', json={
+        'budget': 1000, 'dry_run': True, 'ward_caps': {'North': 300}
+    }, headers=admin).get_json()
+    assert [ward['allocated'] for ward in result['by_ward']] == [300, 300]
+
+
+def test_allocation_rejects_a_minimum_that_rounds_past_the_maximum(client, auth_header):
+    response = client.post('/allocations', json={'budget': 1000, 'min_award': 10.005, 'max_award': 10.005},
+                           headers=auth_header('admin', 'ADMIN1'))
+    assert response.status_code == 400
+
+
+def test_archive_moves_the_whole_cycle(app, bursary, add_applicant, tmp_path):
+    add_applicant('OLD1', cycle=2020)
+    add_applicant('OLD2', cycle=2020)
+    add_applicant('NEW1', cycle=2021)
+    add_application(bursary, 'OLD1', 2020)
+    archive = CycleArchive(str(tmp_path), bursary.cycle_archive.tables)
+
+    with app.app_context():
+        counts = archive.archive(bursary.db.engine, 2020)
+        live = bursary.db.session.scalars(select(bursary.Applicant.admission)).all()
+    with archive.engine(2020).connect() as connection:
+        archived = connection.execute(select(func.count()).select_from(bursary.Applicant.__table__)).scalar()
+
+    assert counts[bursary.Applicant.__tablename__] == 2
+    assert counts[bursary.BursaryApplication.__tablename__] == 1
+    assert live == ['NEW1']
+    assert archived == 2
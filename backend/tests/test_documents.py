@@ -0,0 +1,10 @@
+from documents import pdf_page_count
+
+
+def test_pdf_page_count_across_chunk_boundaries(tmp_path):
+    body = b''.join(b'%d 0 obj << /Type /Page /Parent 1 0 R >> endobj\n' % i for i in range(50))
+    path = tmp_path / 'scan.pdf'
+    path.write_bytes(b'%PDF-1.4\n1 0 obj << /Type /Pages /Count 50 >> endobj\n' + body + b'%%EOF\n')
+    # Small chunks cut page objects at every possible offset
+    for chunk_size in (7, 13, 64, 1024 * 1024):
+        assert pdf_page_count(str(path), chunk_size=chunk_size) == 50
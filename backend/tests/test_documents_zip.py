@@ -0,0 +1,36 @@
+def test_anonymous_request_is_rejected(client):
+    response = client.get('/applicants/documents.zip')
+    assert response.status_code == 401
+
+
+def test_applicant_token_is_forbidden(client, auth_header):
+    response = client.get('/applicants/documents.zip', headers=auth_header('applicant'))
+    assert response.status_code == 403
+
+
+def test_admin_gets_the_archive(client, auth_header):
+    response = client.get('/applicants/documents.zip', headers=auth_header('admin'))
+    assert response.status_code == 200
+    assert response.mimetype == 'application/zip'
+
+
+def test_approval_report_requires_admin(client, auth_header):
+    assert client.get('/reports/approvals.csv').status_code == 401
+    assert client.get('/reports/approvals.csv', headers=auth_header('applicant')).status_code == 403
+    assert client.get('/reports/approvals.csv', headers=auth_header('admin', 'ADM2')).status_code == 200
+
+
+def test_only_admins_and_owners_get_signed_document_urls(client, auth_header, add_applicant):
+    applicant_id = add_applicant('ADM1', id_document='/uploads/id-adm1.pdf')
+    add_applicant('ADM3', id_document='/uploads/id-adm3.pdf')
+
+    anonymous = client.get('/applicants').get_json()
+    assert all('signature=' not in (row['id_document'] or '') for row in anonymous)
+    assert 'signature=' not in client.get(f'/applicants/{applicant_id}').get_json()['id_document']
+
+    owner = client.get('/applicants', headers=auth_header('applicant', 'ADM1')).get_json()
+    signed = {row['admission']: 'signature=' in row['id_document'] for row in owner}
+    assert signed == {'ADM1': True, 'ADM3': False}
+
+    admin = client.get('/applicants', headers=auth_header('admin', 'ADM2')).get_json()
+    assert all('signature=' in row['id_document'] for row in admin)
@@ -0,0 +1,54 @@
+def test_string_valued_rule_is_created_and_evaluated(client, add_applicant):
+    secondary = add_applicant('ADM1', 'Secondary')
+    college = add_applicant('ADM2', 'College')
+
+    response = client.post('/eligibility/rules', json={
+        'name': 'Secondary only', 'field': 'institution_type', 'operator': 'eq', 'value': 'Secondary'
+    })
+    assert response.status_code == 201
+    assert response.get_json()['value'] == 'Secondary'
+
+    response = client.post('/eligibility/run?full=true')
+    assert response.status_code == 200
+    assert client.get(f'/applicants/{secondary}/eligibility').get_json()['eligible'] is True
+    assert client.get(f'/applicants/{college}/eligibility').get_json()['eligible'] is False
+
+
+def test_string_that_looks_like_json_is_kept_as_a_string(client):
+    response = client.post('/eligibility/rules', json={
+        'name': 'Numeric name', 'field': 'institution_name', 'operator': 'eq', 'value': '123'
+    })
+    assert response.status_code == 201
+    assert response.get_json()['value'] == '123'
+
+
+def test_value_shape_is_checked_against_the_operator(client):
+    response = client.post('/eligibility/rules', json={
+        'name': 'Bad in', 'field': 'institution_type', 'operator': 'in', 'value': 'Secondary'
+    })
+    assert response.status_code == 400
+
+
+def test_numeric_fields_and_range_operators_need_numbers(client):
+    for field, operator, value in [
+        ('age', 'gte', '18'),
+        ('family_income', 'eq', '5000'),
+        ('institution_name', 'lt', 'M'),
+        ('age', 'between', [10, '18']),
+    ]:
+        response = client.post('/eligibility/rules', json={
+            'name': 'Bad value', 'field': field, 'operator': operator, 'value': value
+        })
+        assert response.status_code == 400, (field, operator, value)
+    assert client.post('/eligibility/run?full=true').status_code == 200
+
+
+def test_list_elements_must_be_scalars(client):
+    response = client.post('/eligibility/rules', json={
+        'name': 'Bad in', 'field': 'institution_type', 'operator': 'in', 'value': [{'a': 1}]
+    })
+    assert response.status_code == 400
+    response = client.post('/eligibility/rules', json={
+        'name': 'Good in', 'field': 'institution_type', 'operator': 'in', 'value': ['Secondary', 'College']
+    })
+    assert response.status_code == 201
@@ -0,0 +1,19 @@
+def test_fingerprint_leaves_out_passwords(bursary, app):
+    def fingerprint(**body):
+        with app.test_request_context('/register', method='POST', json=body):
+            return bursary.request_fingerprint()
+
+    assert fingerprint(email='a@example.com', password='one') == fingerprint(email='a@example.com', password='two')
+    assert fingerprint(email='a@example.com', password='one') != fingerprint(email='b@example.com', password='one')
+
+
+def test_repeated_registration_is_replayed(client):
+    body = {
+        'full_name': 'Test User', 'admission_number': 'ADM1', 'institution_name': 'Test School',
+        'email': 'adm1@example.com', 'phone_number': '0700000000', 'password': 'secret'
+    }
+    headers = {'Idempotency-Key': 'register-1'}
+    first = client.post('/register', json=body, headers=headers)
+    second = client.post('/register', json=body, headers=headers)
+    assert second.status_code == first.status_code
+    assert second.get_json() == first.get_json()
@@ -0,0 +1,13 @@
+import pytest
+from sqlalchemy.exc import OperationalError
+
+
+def test_failed_statements_do_not_leave_start_times_behind(app, bursary):
+    with app.app_context():
+        with bursary.db.engine.connect() as connection:
+            for _ in range(3):
+                with pytest.raises(OperationalError):
+                    connection.exec_driver_sql('SELECT * FROM no_such_table')
+            assert not connection.info.get('_query_start')
+            connection.exec_driver_sql('SELECT 1')
+            assert not connection.info.get('_query_start')
@@ -0,0 +1,54 @@
+import json
+import sys
+
+import pytest
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token
+
+from auth import admin_required
+from profiling import RequestProfiler, _collapse, _stack_key
+
+
+@pytest.fixture
+def profiled(tmp_path):
+    app = Flask(__name__)
+    app.config.update(
+        JWT_SECRET_KEY='test-secret-key-that-is-long-enough-for-hs256',
+        PROFILER_ENABLED=True,
+        PROFILER_SAMPLE_RATE=1.0,
+        PROFILER_DIR=str(tmp_path),
+    )
+    JWTManager(app)
+    RequestProfiler(app, protect=admin_required)
+
+    @app.route('/ping')
+    def ping():
+        return 'pong'
+
+    return app
+
+
+def admin_header(app):
+    with app.app_context():
+        token = create_access_token(identity='1', additional_claims={'role': 'admin'})
+    return {'Authorization': f'Bearer {token}'}
+
+
+def test_profiles_require_an_administrator(profiled):
+    client = profiled.test_client()
+    assert client.get('/admin/profiles').status_code == 401
+    assert client.get('/admin/profiles/anything.json').status_code == 401
+    assert client.get('/admin/profiles', headers=admin_header(profiled)).status_code == 200
+
+
+def test_credentials_are_redacted_from_dumps(profiled, tmp_path):
+    profiled.test_client().get('/ping?jwt=secret-token&signature=abc&page=2')
+    [dump] = tmp_path.glob('*.json')
+    record = json.loads(dump.read_text())
+    assert 'secret-token' not in dump.read_text()
+    assert record['query_string'] == 'jwt=redacted&signature=redacted&page=2'
+
+
+def test_stack_keys_collapse_outermost_first():
+    collapsed = _collapse(_stack_key(sys._getframe()))
+    assert collapsed.split(';')[-1].startswith('test_stack_keys_collapse_outermost_first (test_profiling.py:')
@@ -0,0 +1,64 @@
+import threading
+import time
+
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token
+
+from ratelimit import AdmissionControl, ConcurrencyLimit, client_key
+
+
+def make_app(**config):
+    app = Flask(__name__)
+    app.config.update(JWT_SECRET_KEY='test-secret-key-that-is-long-enough-for-hs256', **config)
+    JWTManager(app)
+    return app
+
+
+def test_client_key_prefers_the_authenticated_user():
+    app = make_app()
+    with app.app_context():
+        token = create_access_token(identity='42')
+    with app.test_request_context(headers={'Authorization': f'Bearer {token}'}, environ_base={'REMOTE_ADDR': '10.0.0.1'}):
+        assert client_key() == 'user:42'
+    with app.test_request_context(environ_base={'REMOTE_ADDR': '10.0.0.1'}):
+        assert client_key() == 'addr:10.0.0.1'
+    with app.test_request_context(headers={'Authorization': 'Bearer not-a-token'}, environ_base={'REMOTE_ADDR': '10.0.0.1'}):
+        assert client_key() == 'addr:10.0.0.1'
+
+
+def test_waiting_is_refused_when_the_thread_budget_is_spent():
+    app = make_app(SERVER_THREADS=3, ADMISSION_LIMITS={
+        'slow': {'concurrency': 1, 'queue': 5, 'wait': 5},
+    })
+    control = AdmissionControl(app)
+    release = threading.Event()
+
+    @app.route('/slow')
+    def slow():
+        release.wait(5)
+        return 'done'
+
+    holder = threading.Thread(target=lambda: app.test_client().get('/slow'))
+    holder.start()
+    try:
+        limit = control._policies['slow'].slots
+        while limit.in_flight == 0:
+            time.sleep(0.001)
+        # One thread runs and a second may wait; a third would leave no spare thread
+        waiter = threading.Thread(target=lambda: app.test_client().get('/slow'))
+        waiter.start()
+        while limit.busy < 2:
+            time.sleep(0.001)
+        response = app.test_client().get('/slow')
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '5'
+    finally:
+        release.set()
+        holder.join()
+        waiter.join()
+
+
+def test_concurrency_limit_does_not_wait_when_told_not_to():
+    limit = ConcurrencyLimit(1, queue=1, wait=5)
+    assert limit.acquire()
+    assert not limit.acquire(may_wait=False)
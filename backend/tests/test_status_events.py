@@ -0,0 +1,38 @@
+from datetime import datetime
+
+
+def test_stream_accepts_a_query_string_token(client, auth_header):
+    token = auth_header()['Authorization'].split()[1]
+    response = client.get(f'/events/status?jwt={token}', buffered=False)
+    try:
+        assert response.status_code == 200
+        assert response.mimetype == 'text/event-stream'
+    finally:
+        response.close()
+
+
+def test_other_routes_ignore_query_string_tokens(client, auth_header):
+    header = auth_header()
+    token = header['Authorization'].split()[1]
+    assert client.get(f'/me/dashboard?jwt={token}').status_code == 401
+    assert client.get('/me/dashboard', headers=header).status_code == 200
+
+
+def test_status_history_is_in_date_order(client, bursary, app, auth_header):
+    header = auth_header()
+    with app.app_context():
+        bursary.db.session.add_all([
+            bursary.BursaryApplication(
+                admission_number='ADM1', full_name='Test Applicant', email='adm1@example.com',
+                family_income=10000, reason='Fees', application_date=datetime(2024, 3, 1)
+            ),
+            bursary.StatusEvent(admission_number='ADM1', source='applicant', status='pending',
+                                created_at=datetime(2024, 2, 1)),
+            bursary.StatusEvent(admission_number='ADM1', source='application', status='approved',
+                                created_at=datetime(2024, 4, 1)),
+        ])
+        bursary.db.session.commit()
+
+    history = client.get('/get-bursary-status/ADM1', headers=header).get_json()['history']
+    assert [event['date'] for event in history] == sorted(event['date'] for event in history)
+    assert history[1]['details'] == 'Application submitted'
@@ -1,4 +1,4 @@
-import React, { useEffect, useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import axios from 'axios';
 import { Routes, Route, Link } from 'react-router-dom';
 import './AdminDashboard.css';
@@ -12,18 +12,33 @@ function AdminDashboard() {
     const [modalImage, setModalImage] = useState(null);
     const [modalType, setModalType] = useState(null);
     const [feedback, setFeedback] = useState('');
+    const syncCursor = useRef('');
 
     useEffect(() => {
         fetchApplicants();
+        const interval = setInterval(fetchApplicants, 30000);
+        return () => clearInterval(interval);
     }, []);
 
+    // Delta sync: only rows changed or deleted since the last cursor are sent
     const fetchApplicants = () => {
         axios
-            .get('http://127.0.0.1:5000/applicants')
+            // withCredentials sends the read-after-write cookie, so reads follow our own writes
+            .get('http://127.0.0.1:5000/applicants', {
+                params: { since: syncCursor.current },
+                // Document links are only signed for administrators
+                headers: { Authorization: `Bearer ${localStorage.getItem('token')}` },
+                withCredentials: true,
+            })
             .then((response) => {
-                if (response.data) {
-                    setApplicants(response.data);
-                }
+                const { reset, applicants: changed, deleted, cursor } = response.data;
+                setApplicants((prevState) => {
+                    const byId = new Map(reset ? [] : prevState.map((a) => [a.id, a]));
+                    deleted.forEach((id) => byId.delete(id));
+                    changed.forEach((a) => byId.set(a.id, a));
+                    return Array.from(byId.values()).sort((a, b) => a.id - b.id);
+                });
+                syncCursor.current = cursor;
             })
             .catch((error) => {
                 console.error('Error fetching applicants:', error);
@@ -35,7 +50,7 @@ function AdminDashboard() {
     const handleStatusChange = (applicant, status) => {
         // Combine status update and email sending
         axios
-            .patch(`http://127.0.0.1:5000/applicants/${applicant.id}`, { status })
+            .patch(`http://127.0.0.1:5000/applicants/${applicant.id}`, { status }, { withCredentials: true })
             .then(() => {
                 // Send email notification
                 return axios.post('http://127.0.0.1:5000/send-email', {
@@ -171,27 +186,27 @@ Bursary Administrative Team`
                                                 <td>
                                                     <button
                                                         onClick={() =>
-                                                            handleStatusChange(applicant, 'Approved')
+                                                            handleStatusChange(applicant, 'approved')
                                                         }
-                                                        disabled={applicant.status === 'Approved'}
+                                                        disabled={applicant.status === 'approved'}
                                                         className="btn btn-success btn-sm"
                                                     >
                                                         Approve
                                                     </button>
                                                     <button
                                                         onClick={() =>
-                                                            handleStatusChange(applicant, 'Rejected')
+                                                            handleStatusChange(applicant, 'rejected')
                                                         }
-                                                        disabled={applicant.status === 'Rejected'}
+                                                        disabled={applicant.status === 'rejected'}
                                                         className="btn btn-danger btn-sm"
                                                     >
                                                         Reject
                                                     </button>
                                                     <button
                                                         onClick={() =>
-                                                            handleStatusChange(applicant, 'Pending')
+                                                            handleStatusChange(applicant, 'pending')
                                                         }
-                                                        disabled={applicant.status === 'Pending'}
+                                                        disabled={applicant.status === 'pending'}
                                                         className="btn btn-warning btn-sm"
                                                     >
                                                         Pending
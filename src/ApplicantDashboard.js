@@ -6,6 +6,38 @@ import "./ApplicantDashboard.css";
 
 const API_BASE_URL = "http://127.0.0.1:8000"; // Backend base URL
 
+// Swap the refresh token for a new access token instead of logging in again.
+// Callers that need a token at the same time share one request, because
+// each refresh token can only be used once.
+let renewal = null;
+const renewAccessToken = () => {
+  if (!renewal) {
+    renewal = requestNewAccessToken().finally(() => {
+      renewal = null;
+    });
+  }
+  return renewal;
+};
+
+const requestNewAccessToken = async () => {
+  const refreshToken = localStorage.getItem("refreshToken");
+  if (!refreshToken) {
+    return null;
+  }
+  try {
+    const response = await axios.post(`${API_BASE_URL}/auth/refresh`, null, {
+      headers: {
+        Authorization: `Bearer ${refreshToken}`,
+      },
+    });
+    localStorage.setItem("token", response.data.access_token);
+    localStorage.setItem("refreshToken", response.data.refresh_token);
+    return response.data.access_token;
+  } catch (error) {
+    return null;
+  }
+};
+
 const ApplicantDashboard = () => {
   const navigate = useNavigate();
   const [applicantData, setApplicantData] = useState({
@@ -27,35 +59,61 @@ const ApplicantDashboard = () => {
       return;
     }
 
-    const fetchApplicantData = async () => {
+    let events = null;
+    let lastEventId = "";
+    let unmounted = false;
+
+    // Status changes are pushed by the server, so there is no need to refresh.
+    // The stream is reopened with every new access token; last_event_id
+    // replays anything that happened while it was closed.
+    const connectEvents = (accessToken) => {
+      if (events) {
+        events.close();
+      }
+      const params = new URLSearchParams({ jwt: accessToken });
+      if (lastEventId) {
+        params.set("last_event_id", lastEventId);
+      }
+      const source = new EventSource(`${API_BASE_URL}/events/status?${params}`);
+      source.addEventListener("status", (event) => {
+        lastEventId = event.lastEventId;
+        const update = JSON.parse(event.data);
+        setApplicantData(prevData => ({
+          ...prevData,
+          application_status: update.source === "application" ? update.status : prevData.application_status,
+          application_history: [...prevData.application_history, update]
+        }));
+      });
+      source.addEventListener("error", () => {
+        // The browser retries dropped connections itself but gives up when
+        // the server refuses the stream, which happens once the token expires
+        if (source.readyState !== EventSource.CLOSED) {
+          return;
+        }
+        setTimeout(async () => {
+          const renewedToken = unmounted || source !== events ? null : await renewAccessToken();
+          if (renewedToken && !unmounted && source === events) {
+            connectEvents(renewedToken);
+          }
+        }, 5000);
+      });
+      events = source;
+    };
+
+    const fetchApplicantData = async (accessToken, canRenew = true) => {
       setIsLoading(true);
       try {
-        // Fetch user details
-        const userResponse = await axios.get(`${API_BASE_URL}/auth/user`, {
+        // Profile, application status and history in a single round trip
+        const dashboardResponse = await axios.get(`${API_BASE_URL}/me/dashboard`, {
           headers: {
-            Authorization: `Bearer ${token}`,
+            Authorization: `Bearer ${accessToken}`,
           },
         });
 
-        console.log("User Response:", userResponse.data);  // Debug log
-
-        // Fetch application status and history using admission number from user details
-        const applicationResponse = await axios.get(
-          `${API_BASE_URL}/get-bursary-status/${userResponse.data.admission_number}`, 
-          {
-            headers: {
-              Authorization: `Bearer ${token}`,
-            },
-          }
-        );
-        
-        console.log("Application Response:", applicationResponse.data);  // Debug log
-
-        // Merge user data with application status and history
         setApplicantData(prevData => ({
-          ...userResponse.data,
-          application_status: applicationResponse.data.status || "not_applied",
-          application_history: applicationResponse.data.history || []
+          ...dashboardResponse.data.profile,
+          application_status: dashboardResponse.data.application.status || "not_applied",
+          application_history: dashboardResponse.data.history || []
         }));
 
         setError(null);
@@ -69,8 +127,14 @@ const ApplicantDashboard = () => {
           console.error("Error Response Status:", error.response.status);
           
           if (error.response.status === 401) {
-            // Token might be expired, redirect to login
+            const renewedToken = canRenew ? await renewAccessToken() : null;
+            if (renewedToken) {
+              connectEvents(renewedToken);
+              return fetchApplicantData(renewedToken, false);
+            }
+            // Refresh token expired or revoked, redirect to login
             localStorage.removeItem("token");
+            localStorage.removeItem("refreshToken");
             navigate("/login");
           }
           
@@ -91,12 +155,25 @@ const ApplicantDashboard = () => {
       }
     };
 
-    fetchApplicantData();
+    fetchApplicantData(token);
+    connectEvents(token);
+
+    return () => {
+      unmounted = true;
+      events.close();
+    };
   }, [navigate]);
 
   
   const handleLogout = () => {
+    const refreshToken = localStorage.getItem("refreshToken");
+    if (refreshToken) {
+      axios.post(`${API_BASE_URL}/auth/logout`, null, {
+        headers: { Authorization: `Bearer ${refreshToken}` },
+      }).catch(() => {});
+    }
     localStorage.removeItem("token");
+    localStorage.removeItem("refreshToken");
     navigate("/login");
   };
 
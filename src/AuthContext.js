@@ -27,10 +27,13 @@ export const AuthProvider = ({ children }) => {
     }
   }, []);
 
-  const login = (userData, token) => {
+  const login = (userData, token, refreshToken) => {
     try {
       localStorage.setItem('user', JSON.stringify(userData));
       localStorage.setItem('token', token);
+      if (refreshToken) {
+        localStorage.setItem('refreshToken', refreshToken);
+      }
       setIsAuthenticated(true);
       setUser(userData);
     } catch (error) {
@@ -40,6 +43,7 @@ export const AuthProvider = ({ children }) => {
 
   const logout = () => {
     localStorage.removeItem('token');
+    localStorage.removeItem('refreshToken');
     localStorage.removeItem('user');
     setIsAuthenticated(false);
     setUser(null);
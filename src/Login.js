@@ -690,10 +690,10 @@ function Login() {
       }
 
       const data = await response.json();
-      const { user, token } = data;
+      const { user, token, refresh_token } = data;
 
       // Use the login method from AuthContext
-      login(user, token);
+      login(user, token, refresh_token);
 
       setSuccess('Login successful! Redirecting...');
 